@@ -5,30 +5,559 @@
 # NOTE: The "type: ignore" commtents are for the vs-code micropico extension only! The main reason is that the values from the JSON-File are unknown
 # NOTE: For WW/CW LEDs (24V): setting bpp = 3 is required (Byte 0=warm, 1=cold, 2=not used)
 
-version=[7,2,1]
+version=[7,21,0]
 
 import utime as time
+from array import array
 from neopixel import NeoPixel
 from machine import Pin
-from json_config_parser import config
+from json_config_parser import config, journal
 import logger
+import boot_frame
 
 try:
     from typing import Any
 except ImportError:
     Any = object
 
+# Perceptual dimming: level (0...255) -> LED duty (0...255) by the CIE 1931 lightness curve.
+# Built once. Every level above 0 keeps at least duty 1, so low levels do not switch off.
+# GAMMA16 is the same curve with 16 bit (0...65535) for the temporal dithering.
+def _gamma_table(table, top):
+    for i in range(1, 256):
+        lightness = i * 100 / 255
+        if lightness <= 8:
+            y = lightness / 903.3
+        else:
+            y = ((lightness + 16) / 116) ** 3
+        table[i] = max(1, int(y * top + 0.5))
+    return table
+
+GAMMA = _gamma_table(bytearray(256), 255)
+GAMMA16 = _gamma_table(array('H', bytes(512)), 65535)
+
+# Temporal dithering: the part of a channel below 1 (in 1/8) is spread over 8 frames.
+# DITHER[fraction << 3 | phase] is 0 or 1, precomputed by an error-accumulator: +fraction per frame, 1 and -8 on overflow.
+# Only colors with all channels below DITHER_BELOW are dithered, above it the steps of 1 are not visible.
+DITHER_BITS = 3
+DITHER_MASK = (1 << DITHER_BITS) - 1
+DITHER_BELOW = 64
+
+def _dither_table():
+    table = bytearray(1 << 2 * DITHER_BITS)
+    for fraction in range(1 << DITHER_BITS):
+        acc = 0
+        for phase in range(1 << DITHER_BITS):
+            acc += fraction
+            if acc > DITHER_MASK:
+                acc -= 1 << DITHER_BITS
+                table[fraction << DITHER_BITS | phase] = 1
+    return table
+
+DITHER = _dither_table()
+
+# Easing-curves for transitions: progress (0...255) -> eased progress (0...255). Built once.
+# linear, ease (ease-in-out, cosine) and exp (exponential ease-in, slow start for fades from dark)
+def _easing_tables():
+    from math import cos, pi
+    ease = bytearray(256)
+    exp = bytearray(256)
+    for i in range(256):
+        t = i / 255
+        ease[i] = int((1 - cos(pi * t)) / 2 * 255 + 0.5)
+        exp[i] = int((2 ** (8 * t) - 1) / 255 * 255 + 0.5)
+    return {'linear': bytearray(range(256)), 'ease': ease, 'exp': exp}
+
+EASING = _easing_tables()
+
+# Tables of the effects, built once:
+# SINE: phase (0...255) -> brightness (0...255), a cosine that starts and ends at full brightness
+# HUE: hue (0...255) -> r, g, b (3 bytes per hue), the color wheel
+def _effect_tables():
+    from math import cos, pi
+    sine = bytearray(256)
+    hue = bytearray(768)
+    for i in range(256):
+        sine[i] = int((1 + cos(2 * pi * i / 256)) / 2 * 255 + 0.5)
+        if i < 85:
+            rgb = (255 - i * 3, i * 3, 0)
+        elif i < 170:
+            rgb = (0, 255 - (i - 85) * 3, (i - 85) * 3)
+        else:
+            rgb = ((i - 170) * 3, 0, 255 - (i - 170) * 3)
+        hue[i * 3:i * 3 + 3] = bytes(rgb)
+    return sine, hue
+
+SINE, HUE = _effect_tables()
+
+# Direct access to the NeoPixel-buffer. A color is converted once into a pixel-pattern in the wire order of the strip,
+# then copied into the buffer. This avoids the NeoPixel.__setitem__ call (and its reordering) for every pixel.
+# Changes are tracked as a dirty byte-range. show() only writes to the strip if something changed, and only up to the last changed pixel.
+class FrameBuffer:
+    def __init__(self, np, bpp, id='main'):
+        self.id     = id
+        self.np     = np
+        self.bpp    = bpp
+        self.buf    = np.buf
+        self.mv     = memoryview(np.buf)
+        self.n      = len(np.buf) // bpp
+        self.order  = np.ORDER
+
+        self.lo     = 0     # dirty range in bytes: lo...hi-1
+        self.hi     = 0
+        self.fills  = {}    # (start, end) -> pattern of a filled range, as long as the range is unchanged
+
+        self.writes     = 0
+        self.skipped    = 0
+
+        # Sum of all bytes for the power limiter. Updated with every change by the difference of the changed bytes
+        self.sum        = sum(self.buf)
+        # Scale of the power limiter (256=off). The strip gets a scaled copy, only the changed bytes are scaled again
+        self.scale      = 256
+        self._table     = None
+        self._scaled    = None
+
+        # Partial writes need the bitstream of the port. Otherwise the whole buffer is written by NeoPixel.write()
+        try:
+            from machine import bitstream
+            self._bitstream = bitstream
+        except ImportError:
+            self._bitstream = None
+
+    # color (rgb/rgbw) -> pixel-pattern in wire order
+    def pattern(self, color, out=None):
+        if out is None:
+            out = bytearray(self.bpp)
+        for i in range(self.bpp):
+            out[self.order[i]] = color[i]
+        return out
+
+    def mark(self, a, b):
+        if self.lo >= self.hi:
+            self.lo = a
+            self.hi = b
+        else:
+            self.lo = min(self.lo, a)
+            self.hi = max(self.hi, b)
+
+    def is_dirty(self):
+        return self.lo < self.hi
+
+    # Forget the filled ranges that overlap the pixels start...end-1
+    def _forget(self, start, end):
+        for key in list(self.fills):
+            if key[0] < end and start < key[1]:
+                del self.fills[key]
+
+    # Fill the pixels start...end-1 with one pattern. The filled part is doubled with every copy.
+    # Returns False, if the range already has this pattern.
+    def fill(self, pattern, start=0, end=None):
+        if end is None:
+            end = self.n
+        bpp = self.bpp
+        a = start * bpp
+        total = end * bpp - a
+        if total <= 0:
+            return False
+        key = (start, end)
+        memo = self.fills.get(key)
+        if memo == pattern:
+            return False
+        if memo is not None and len(memo) == bpp:
+            old = sum(memo) * (total // bpp)
+        else:
+            old = sum(self.mv[a:a + total])
+        self.sum += sum(pattern) * (total // bpp) - old
+        if self.fills:
+            self._forget(start, end)
+        mv = self.mv
+        mv[a:a + bpp] = pattern
+        filled = bpp
+        while filled < total:
+            n = min(filled, total - filled)
+            mv[a + filled:a + filled + n] = mv[a:a + n]
+            filled += n
+        # The pattern is kept in the memo of the range, a new one is only needed for a new range
+        if memo is None or len(memo) != len(pattern):
+            memo = bytearray(pattern)
+        else:
+            memo[:] = pattern
+        self.fills[key] = memo
+        self.mark(a, a + total)
+        return True
+
+    # Set one pixel. Returns False, if it already has this pattern.
+    # Compared and changed byte by byte in place, a slice of the buffer would be an allocation per pixel
+    def put(self, index, pattern):
+        buf = self.buf
+        a = index * self.bpp
+        delta = 0
+        changed = False
+        b = a
+        for value in pattern:
+            old = buf[b]
+            if old != value:
+                delta += value - old
+                buf[b] = value
+                changed = True
+            b += 1
+        if not changed:
+            return False
+        self.sum += delta
+        if self.fills:
+            self._forget(index, index + 1)
+        if self.lo >= self.hi:
+            self.lo = a
+            self.hi = b
+        else:
+            if a < self.lo:
+                self.lo = a
+            if b > self.hi:
+                self.hi = b
+        return True
+
+    # Set the pixels leds[start:end] (i.e. the next part of a line) to one pattern, like put(). Returns the number of changed pixels
+    def put_pixels(self, leds, start, end, pattern):
+        buf = self.buf
+        bpp = self.bpp
+        lo = len(buf)
+        hi = 0
+        delta = 0
+        count = 0
+        for k in range(start, end):
+            a = leds[k] * bpp
+            b = a
+            changed = False
+            for value in pattern:
+                old = buf[b]
+                if old != value:
+                    delta += value - old
+                    buf[b] = value
+                    changed = True
+                b += 1
+            if changed:
+                count += 1
+                if a < lo:
+                    lo = a
+                if b > hi:
+                    hi = b
+        if count:
+            self.sum += delta
+            if self.fills:
+                self._forget(lo // bpp, hi // bpp)
+            self.mark(lo, hi)
+        return count
+
+    # Copy pixel-bytes (wire order, bpp bytes per pixel) from pixel 'start'. Returns the number of pixels copied
+    def blit(self, data, start=0):
+        bpp = self.bpp
+        a = start * bpp
+        if a < 0:
+            return 0
+        n = min(len(data), len(self.buf) - a)
+        n -= n % bpp
+        if n <= 0:
+            return 0
+        if self.fills:
+            self._forget(start, start + n // bpp)
+        data = data if len(data) == n else data[:n]
+        self.sum += sum(data) - sum(self.mv[a:a + n])
+        self.mv[a:a + n] = data
+        self.mark(a, a + n)
+        return n // bpp
+
+    # Run-length encoded pixels from pixel 'start': [count][pixel-bytes] per run. Returns the number of pixels set
+    def blit_rle(self, data, start=0):
+        step = self.bpp + 1
+        pixel = max(start, 0)
+        i = 0
+        while i + step <= len(data) and pixel < self.n:
+            end = min(pixel + data[i], self.n)
+            if end > pixel:
+                self.fill(bytes(data[i + 1:i + step]), pixel, end)
+                pixel = end
+            i += step
+        return pixel - max(start, 0)
+
+    # Number of pixels blit() or blit_rle() would set, without changing the buffer
+    def count(self, data, start=0, rle=False):
+        if start < 0 or start >= self.n:
+            return 0
+        if not rle:
+            return min(len(data) // self.bpp, self.n - start)
+        step = self.bpp + 1
+        pixels = 0
+        for i in range(0, len(data) - step + 1, step):
+            pixels += data[i]
+        return min(pixels, self.n - start)
+
+    # Scale of the power limiter (0...256). A new scale needs a new table and a scaled copy of the whole buffer
+    def set_scale(self, scale):
+        if scale == self.scale:
+            return
+        self.scale = scale
+        if scale < 256:
+            self._table = bytearray((v * scale) >> 8 for v in range(256))
+            if self._scaled is None:
+                self._scaled = bytearray(len(self.buf))
+        self.mark(0, len(self.buf))
+
+    # Write the changes to the strip. Skipped, if nothing changed since the last write
+    def show(self):
+        if self.lo >= self.hi:
+            self.skipped += 1
+            return False
+        if self.scale < 256:
+            table = self._table
+            buf = self.buf
+            out = self._scaled
+            for i in range(self.lo, self.hi):
+                out[i] = table[buf[i]]
+            self._write(out)
+        elif self._bitstream and self.hi < len(self.buf):
+            self._bitstream(self.np.pin, 0, self.np.timing, self.mv[:self.hi])
+        else:
+            self.np.write()
+        self.writes += 1
+        self.lo = self.hi = 0
+        return True
+
+    # Write another buffer of the same size (the scaled copy) to the strip
+    def _write(self, out):
+        if self._bitstream:
+            self._bitstream(self.np.pin, 0, self.np.timing, memoryview(out)[:self.hi])
+        else:
+            buf = self.np.buf
+            self.np.buf = out
+            self.np.write()
+            self.np.buf = buf
+
+    # Write the whole buffer, changed or not
+    def write(self):
+        self.mark(0, len(self.buf))
+        self.show()
+
+    def get_info(self):
+        return {"led_qty": self.n, "bpp": self.bpp, "writes": self.writes, "skipped_writes": self.skipped, "scale": self.scale}
+
+# One running effect. 'frames' is a generator that is sent the elapsed ms since the start, renders the matching frame and yields the ms left.
+# Animations on the same channel ('level' or 'color') run one after another, different channels run at the same time.
+class Animation:
+    def __init__(
+            self, 
+            name, 
+            channel, 
+            frames, 
+            duration
+            ):
+        self.name       = name
+        self.channel    = channel
+        self.frames     = frames
+        self.duration   = duration
+        self.ms_left    = duration
+        self.started    = None
+
+    # Render the frame for 'now'. Returns False when the animation is done
+    def step(self, now):
+        try:
+            if self.started is None:
+                self.started = now
+                next(self.frames)
+            self.ms_left = self.frames.send(time.ticks_diff(now, self.started))
+            return True
+        except StopIteration:
+            self.ms_left = 0
+            return False
+
+# Renders at a fixed frame rate, driven by ticks_ms. If a frame is late, the missed frame-slots are dropped
+# instead of being rendered later, so an animation always takes its duration, independent of the strip length.
+class RenderScheduler:
+    def __init__(self, fps=50):
+        self.target_fps = fps
+        self.period     = max(1, 1000 // fps)
+        self.next_frame = time.ticks_ms()
+
+        self.frames     = 0     # rendered frames
+        self.overruns   = 0     # frames that took longer than the period
+        self.dropped    = 0     # skipped frame-slots
+        self.fps        = 0     # achieved frames per second
+
+        self._window        = self.next_frame
+        self._window_frames = 0
+
+    # Start a new timeline, i.e. when an animation starts after idle
+    def resync(self, now):
+        self.next_frame = now
+        self._window = now
+        self._window_frames = 0
+
+    # True, if a frame is due. Missed slots are counted and skipped
+    def due(self, now):
+        late = time.ticks_diff(now, self.next_frame)
+        if late < 0:
+            return False
+        missed = late // self.period
+        self.dropped += missed
+        self.next_frame = time.ticks_add(self.next_frame, (missed + 1) * self.period)
+        return True
+
+    # Call after the frame for 'start' is rendered
+    def rendered(self, start):
+        now = time.ticks_ms()
+        self.frames += 1
+        if time.ticks_diff(now, start) > self.period:
+            self.overruns += 1
+        self._window_frames += 1
+        span = time.ticks_diff(now, self._window)
+        if span >= 1000:
+            self.fps = self._window_frames * 1000 // span
+            self._window = now
+            self._window_frames = 0
+
+    def frames_for(self, ms):
+        return (ms + self.period - 1) // self.period
+
+    def get_info(self):
+        return {"target_fps": self.target_fps, "fps": self.fps, "frames": self.frames, "overruns": self.overruns, "dropped": self.dropped}
+
+# A range of pixels (start...end-1) with its own color, level and animations. All segments render into the same FrameBuffer.
+class Segment:
+    def __init__(
+            self, 
+            name, 
+            fb, 
+            start, 
+            end, 
+            color, 
+            level=0
+            ):
+        self.name       = name
+        self.fb         = fb
+        self.start      = start
+        self.end        = end
+        self.color      = list(color)
+        self.level      = level
+
+        # Queued animations per channel. Only the first one of each channel is running
+        self.animations = {}
+
+        self.pattern    = bytearray(fb.bpp)
+        self._level     = -1
+        self._color     = None
+        self._dimmed    = (0, 0, 0, 0)
+
+        # Temporal dithering (set by LightControl). 'dithering' is True while the segment shows its color and a channel has a fraction
+        self.dither     = False
+        self.dithering  = False
+        self.frac       = bytearray(fb.bpp)
+        self._fracs     = False
+        self._out       = bytearray(fb.bpp)
+
+    def size(self):
+        return self.end - self.start
+
+    # Dimmed color by the gamma-table (level: 0...1). Only recomputed when color or level changes
+    def dim_color(
+            self, 
+            color, 
+            level
+            ):
+        index = int(level * 255 + 0.5)
+        duty = GAMMA[index]
+        if index != self._level or color != self._color:
+            self._level = index
+            self._color = color[:4]
+            self._dimmed = (
+                (color[0] * duty + 127) // 255,
+                (color[1] * duty + 127) // 255,
+                (color[2] * duty + 127) // 255,
+                (color[3] * duty + 127) // 255
+            )
+            self.fb.pattern(self._dimmed, self.pattern)
+            if self.dither:
+                self._dither_color(color, level)
+        return self._dimmed
+
+    # Same as dim_color with GAMMA16: pattern gets the integer part, frac the part below 1 (in 1/8)
+    def _dither_color(self, color, level):
+        duty = GAMMA16[int(level * 255 + 0.5)]
+        order = self.fb.order
+        fracs = False
+        top = 0
+        for i in range(self.fb.bpp):
+            v = (color[i] * duty + 4096) >> (16 - DITHER_BITS)
+            self.pattern[order[i]] = v >> DITHER_BITS
+            self.frac[order[i]] = v & DITHER_MASK
+            fracs = fracs or v & DITHER_MASK
+            top = max(top, v >> DITHER_BITS)
+        self._fracs = bool(fracs) and top < DITHER_BELOW
+
+    # Fill the segment with the dithered pattern of the frame-phase (0...7)
+    def dither_frame(self, phase):
+        out = self._out
+        base = self.pattern
+        frac = self.frac
+        for i in range(len(out)):
+            out[i] = base[i] + DITHER[frac[i] << DITHER_BITS | (phase + i) & DITHER_MASK]
+        self.fb.fill(out, self.start, self.end)
+
+    # Fill the segment with its color and level
+    def render(
+            self, 
+            color=None, 
+            level=None
+            ):
+        if color is not None:
+            self.color = color
+        if level is not None:
+            self.level = level
+        self.dim_color(self.color, self.level)
+        self.fb.fill(self.pattern, self.start, self.end)
+        self.dithering = self._fracs
+
+    # True, if the strip shows the color and level of the segment on all of its pixels (not i.e. a replaced line)
+    def shows_color(self):
+        if self.dithering:
+            return True
+        self.dim_color(self.color, self.level)
+        bpp = self.fb.bpp
+        return self.fb.buf[self.start * bpp:self.end * bpp] == self.pattern * self.size()
+
+    # Running animation of a channel or None
+    def running(self, channel):
+        queue = self.animations.get(channel)
+        return queue[0] if queue else None
+
+    def is_active(self):
+        for queue in self.animations.values():
+            if queue:
+                return True
+        return False
+
+    def get_info(self):
+        return {"output": self.fb.id, "range": [self.start, self.end], "color": self.color, "light_level": int(self.level * 100)}
+
 class LightControl:
     def __init__(
             self,
             use_config_json=True, 
             config_file='/params/config.json', 
             status_file='/params/status.json',
+            frame_file=None,
             logging=True,
             led_pin=15,
             bpp=3,
             pixel_pty=12,
-            autostart=True
+            autostart=True,
+            fps=50,
+            segments=None,
+            outputs=None,
+            dither=False,
+            dither_fps=100,
+            max_ma=0,
+            ma_per_channel=20,
+            idle_ma=1,
+            save_delay=2000
             ):
         
         """
@@ -36,21 +565,44 @@ class LightControl:
             use_config_json (bool): True, if a JSON file is used for settings. Must have 2 layers. The json_config_parser is needed.
             config_file (str): Location of the configuration-file.
             status_file (str): Location of the status-file, where level and color will be saved.
+            frame_file (str): Location of the raw frame for the fast boot (see boot_frame.py). None=boot_frame.FILE. Only written with autostart.
             logging (bool): Events are logged in the /log/ directory
             led_pin (int): Neopixel LED-Pin.
             bpp (int): Bytes per pixel value. 3=RGB, 4=RGBW
             pixel_pty (int): The Number of LEDs that are adressed.
             autostart (bool): Load the last color- and dim- setting from the status.json file.
+            fps (int): Frame rate of the animations. Can be set with 'fps' in the LightControl_settings.
+            segments (dict): Named pixel-ranges, i.e. {"cabinet": [0, 30], "shelf": [30, 60, "desk"]}. The optional third value is the output-id, default is the first output.
+                Can be set with 'segments' in the LightControl_settings. The pixels of an output without a segment are one segment, named by the output-id
+                (further gaps: '<id>.2', '<id>.3', ...). Without segments, every output is one segment.
+            outputs (list): Physical strips, i.e. [{"id": "desk", "led_pin": 15, "led_qty": 60, "bytes_per_pixel": 4}, ...]. Missing values are taken from led_pin, led_qty and bpp.
+                Can be set with 'outputs' in the LightControl_settings. Without outputs, there is one output 'main' on led_pin.
+                Without an id, the first output is 'main' and the others 'out<index>' (i.e. 'out1'). An output with an id used before is logged and ignored.
+            dither (bool): Temporal dithering of static colors, for smooth dimming at low levels. Can be set with 'dither' in the LightControl_settings.
+            dither_fps (int): Frame rate while dithering (8 frames per cycle). Can be set with 'dither_fps' in the LightControl_settings.
+            max_ma (int): Current budget of the power supply in mA. 0=no limit. If the estimated draw is higher, all outputs are scaled down. Can be set with 'max_ma' in the LightControl_settings.
+            ma_per_channel (int): Current of one channel (R, G, B or W) at 255 in mA. Can be set with 'ma_per_channel' in the LightControl_settings.
+            idle_ma (int): Current of one pixel when it is off in mA. Can be set with 'idle_ma' in the LightControl_settings.
+            save_delay (int): Time in ms without a change, before color and level are written to the status-file. Can be set with 'save_delay' in the LightControl_settings.
 
         Methods:
         --------
             static(): sets all pixels at the same time.
+            frame(): copies raw or run-length encoded pixel-bytes to the strip with one write.
             line(): sets pixels by line-animation
             set_smooth(): sets pixels by a smooth transition
             set_dim(): sets a dimmer-level
+            effect(): runs an effect from EFFECTS (breathing, rainbow, chase, twinkle)
+            tick(): renders the next frame of the running animations. Call it in the main loop.
+            submit(): runs a method here or on the render core (render_core.py), if it runs.
+            query(): like submit(), but waits for the result.
+            finish(): runs all queued animations to the end (blocking).
             change_autostart(): sets the autostart-state. If true, the pixels will be set to the last known state when power on
             change_pixel_qty(): changes the pixel-quantity
+            check_save(): writes color and level to the status-file, debounced. Call it in the main loop.
             ret_dim(self): returns the actual light level
+
+        The color- and dim-functions take an optional 'segment' (name or list of names) and 'output' (id). Without them, all segments are changed.
         """
 
         if use_config_json:
@@ -59,20 +611,48 @@ class LightControl:
             self.bpp        = self.settings.get('LightControl_settings', 'bytes_per_pixel')
             self.autostart  = self.settings.get('LightControl_settings', 'autostart')
             self.pixel_qty  = self.settings.get('LightControl_settings', 'led_qty')
+            try:
+                fps = self.settings.get('LightControl_settings', 'fps')
+            except KeyError:
+                pass
+            try:
+                segments = self.settings.get('LightControl_settings', 'segments')
+            except KeyError:
+                pass
+            try:
+                outputs = self.settings.get('LightControl_settings', 'outputs')
+            except KeyError:
+                pass
+            try:
+                dither = self.settings.get('LightControl_settings', 'dither')
+                dither_fps = self.settings.get('LightControl_settings', 'dither_fps')
+            except KeyError:
+                pass
+            try:
+                max_ma = self.settings.get('LightControl_settings', 'max_ma')
+                ma_per_channel = self.settings.get('LightControl_settings', 'ma_per_channel')
+                idle_ma = self.settings.get('LightControl_settings', 'idle_ma')
+            except KeyError:
+                pass
+            try:
+                save_delay = self.settings.get('LightControl_settings', 'save_delay')
+            except KeyError:
+                pass
         else:
             self.led_pin    = led_pin
             self.bpp        = bpp
             self.pixel_qty  = pixel_pty
             self.autostart  = autostart
 
-        self.status     = config(status_file, layers=1)
-        self.cache      = self.status.get(param='color')
+        self.status     = journal(status_file, debounce=save_delay)
         self.dim_status = self.status.get(param='dim_status')
 
         if logging:
             self.event = logger.Create('LightControl', '/log')
         else:
             self.event = logger.DummyLogger()
+        # Logger of core 0 (main loop). self.event is replaced by the queue of core 1, when the render core runs
+        self.event0 = self.event
 
         # Check Pixel-Value
         if self.pixel_qty is None:
@@ -80,104 +660,396 @@ class LightControl:
             self.event.log('E', f'Initialization failed! - {missing_pixel_error}')
             return missing_pixel_error
         
-        self.pixel: int = int(self.pixel_qty)
+        # Every output has its own NeoPixel and FrameBuffer. The first one is also self.np/self.fb
+        self.outputs = []
+        self.pins = []
+        for index, output in enumerate(outputs or [{}]):
+            id = output.get('id', 'out%d' % index if index else 'main')
+            if self.get_output(id) is not None:
+                self.event.log('E', 'Output %s ignored, duplicate id %s', index, id)
+                continue
+            self.pins.append(output.get('led_pin', self.led_pin))
+            pin = Pin(self.pins[-1], Pin.OUT, value=0)
+            bpp = output.get('bytes_per_pixel', self.bpp)
+            np = NeoPixel(pin, int(output.get('led_qty', self.pixel_qty)), bpp=bpp) # type: ignore # type
+            self.outputs.append(FrameBuffer(np, bpp, id))
+
+        self.fb = self.outputs[0]
+        self.np: Any = self.fb.np
+        self.led = self.np.pin
+        self.pixel: int = self.fb.n
+
+        color = self.status.get(param='color')
+        self.segments = self._create_segments(segments, color)
+        self.dither = bool(dither)
+        self._phase = 0
+        for seg in self.segments:
+            seg.dither = self.dither
+
+        # Set by the animations, check_save() hands the state to the journal of the status-file. _frame: raw frame of the last snapshot()
+        self._frame = None
+        self.needs_save = False
+
+        self.scheduler = RenderScheduler(max(fps, dither_fps) if self.dither else fps)
 
-        self.level = 0
-        self.led = Pin(self.led_pin, Pin.OUT, value=0)
-        self.np: Any = NeoPixel(self.led, self.pixel, bpp=self.bpp) # type: ignore # type
+        # RenderCore, if the render loop runs on core 1. Then LightControl is only changed through submit()
+        self.core = None
 
-        # Set save-timer
-        self.last_change = 0
-        self.need_save = False
+        # Power limiter
+        self.max_ma         = max_ma
+        self.ma_per_channel = ma_per_channel
+        self.idle_ma        = idle_ma * sum(fb.n for fb in self.outputs)
+        self.draw_ma        = 0
+        self.peak_ma        = 0
+        self.limit_events   = 0
+        self.limited        = False
+        if self.max_ma and self.idle_ma >= self.max_ma:
+            self.event.log('W', 'Idle draw of %d mA is above the power budget of %d mA', self.idle_ma, self.max_ma)
+        self._rendering = False
 
+        self.frame_file = frame_file
         if self.autostart:
-            self.set_dim(self.dim_status)
+            try:
+                saved = self.status.get(param='segments')
+            except KeyError:
+                saved = {}
+            for seg in self.segments:
+                state = saved.get(seg.name)
+                if state:
+                    seg.color = list(state[0])
+                level = state[1] if state else self.dim_status
+                # The strip already shows the saved frame, a ramp from 0 would flash it off
+                if boot_frame.shown:
+                    seg.render(level=level / 100)
+                else:
+                    self.set_dim(level, segment=seg.name)
+            if boot_frame.shown:
+                self.show()
+            self.finish()
+            # the saved state, nothing to write
+            self.needs_save = False
+        else:
+            # A frame of an earlier autostart is not shown at the next boot
+            boot_frame.remove(self.frame_file)
+
+    def _create_segments(self, ranges, color):
+        segments = []
+        if ranges:
+            for name in ranges:
+                start, end = ranges[name][:2]
+                fb = self.outputs[0]
+                if len(ranges[name]) > 2:
+                    fb = self.get_output(ranges[name][2])
+                    if fb is None:
+                        self.event.log('W', 'Segment %s ignored, unknown output %s', name, ranges[name][2])
+                        continue
+                start = max(0, int(start))
+                end = min(fb.n, int(end))
+                if start >= end:
+                    self.event.log('W', 'Segment %s ignored, invalid range %s', name, ranges[name])
+                    continue
+                segments.append(Segment(name, fb, start, end, color))
+        # Every pixel can be addressed: the gaps between the named segments are segments of their own
+        names = [seg.name for seg in segments]
+        for fb in self.outputs:
+            pos = 0
+            for start, end in sorted((seg.start, seg.end) for seg in segments if seg.fb is fb) + [(fb.n, fb.n)]:
+                if start > pos:
+                    name = fb.id
+                    count = 1
+                    while name in names:
+                        count += 1
+                        name = fb.id + '.' + str(count)
+                    names.append(name)
+                    segments.append(Segment(name, fb, pos, start, color))
+                pos = max(pos, end)
+        segments.sort(key=lambda seg: (self.outputs.index(seg.fb), seg.start))
+        return segments
+
+    def get_output(self, id):
+        for fb in self.outputs:
+            if fb.id == id:
+                return fb
+        return None
+
+    # Segments addressed by 'segment' (None=all, name or list of names) and 'output' (None=all, id)
+    def get_segments(self, segment=None, output=None):
+        segments = self.segments
+        if output is not None:
+            fb = self.get_output(output)
+            if fb is None:
+                raise ValueError('Unknown output: ' + str(output))
+            segments = [seg for seg in segments if seg.fb is fb]
+        if segment is None:
+            return segments
+        names = [segment] if isinstance(segment, str) else segment
+        found = []
+        for name in names:
+            for seg in segments:
+                if seg.name == name:
+                    found.append(seg)
+                    break
+            else:
+                raise ValueError('Unknown segment: ' + str(name))
+        return found
+
+    # Color and level of the first segment. Setting them changes all segments
+    @property
+    def cache(self):
+        return self.segments[0].color
+
+    @cache.setter
+    def cache(self, color):
+        for seg in self.segments:
+            seg.color = list(color)
+
+    @property
+    def level(self):
+        return self.segments[0].level
+
+    @level.setter
+    def level(self, level):
+        for seg in self.segments:
+            seg.level = level
 
     # static color (also used by dim)
     def static(
             self, 
             color, 
-            level_255=None
+            level=None,
+            segment=None,
+            output=None
             ):
         while len(color) < 4:
             color.append(0)
         
-        if level_255 is None:
-            level_255 = int(self.level * 255)
-        dimmed_color = tuple((c * level_255) // 255 for c in color[:4])
-
-        for i in range(self.pixel):
-            self.np[i] = dimmed_color
-        self.np.write()
-        self.cache = color
+        for seg in self.get_segments(segment, output):
+            seg.render(color, level)
+        self.show()
         return color
 
     def clear(self):
-        for i in range(self.pixel):
-            self.np[i] = (0, 0, 0, 0) 
-        self.np.write()
+        for fb in self.outputs:
+            fb.fill(bytearray(fb.bpp))
+        self.show()
 
     # Dim functions
     def set_dim(
             self, 
             target, 
             speed=1,
-            steps=2
+            steps=2,
+            policy='replace',
+            segment=None,
+            output=None
             ):
         
         """
-        Dims the LED-levels in a smooth animation.
+        Dims the LED-levels in a smooth animation. Returns immediately, the animation is rendered by tick().
 
         Parameter:
             target (int): Target-Level. Values from 0-100.
-            speed (int): Pause between the 1%-steps in ms.
+            speed (int): Duration of one step in ms. The animation takes speed * (level-difference / steps) ms.
+            steps (int): Level-change per step in %.
+            policy (str): 'replace', 'queue' or 'blend'. See POLICIES.
+            segment (str): Name (or list of names) of the segments. None=all.
+            output (str): Id of the output. None=all.
         """
 
-        actual = int(self.level * 100)
         target = int(target)
-        if actual == target:
-            return
-
-        if target > actual:
-            self._ramp_up(actual, target, speed, steps)
-        else:
-            self._ramp_down(actual, target, speed, steps)
-
-        self.last_change = time.time()
-        self.needs_save = True
+        if not 0 <= target <= 100:
+            raise ValueError('Level out of range (0-100): ' + str(target))
+        for seg in self.get_segments(segment, output):
+            duration = (abs(target - int(seg.level * 100)) + steps - 1) // steps * speed
+            running = seg.running('level')
+            if policy == 'blend' and running:
+                duration = running.ms_left
+            self.start(seg, Animation('dim', 'level', self._dim_frames(seg, target, duration), duration), policy)
         return True
 
-    def _ramp_up(
+    def _dim_frames(
             self, 
-            actual, 
+            seg, 
             target, 
-            speed,
-            steps=2
+            duration
             ):
-        while actual < target:
-            actual += steps
-            if actual > target:
-                actual = target
-            self.level = actual / 100
-            self.static(self.cache, self.level)
-            time.sleep_ms(speed)
-
-    def _ramp_down(
+        actual = int(seg.level * 100)
+        if actual == target:
+            return
+        elapsed = yield
+        while True:
+            if elapsed >= duration:
+                level = target
+            else:
+                level = actual + (target - actual) * elapsed // duration
+            # A running color-animation renders its own frame with the new level, render() would paint over it
+            if seg.running('color'):
+                seg.level = level / 100
+            else:
+                seg.render(level=level / 100)
+            if level == target:
+                break
+            elapsed = yield duration - elapsed
+
+        self.needs_save = True
+
+    # Start or queue an animation in a segment, depending on the policy
+    def start(
             self, 
-            actual, 
-            target, 
-            speed,
-            steps=2
+            seg, 
+            animation, 
+            policy='queue'
             ):
-        while actual > target:
-            actual -= steps
-            if actual < target:
-                actual = target
-            self.level = actual / 100
-            self.static(self.cache, self.level)
-            time.sleep_ms(speed)
+        if policy not in POLICIES:
+            raise ValueError('Unknown policy: ' + str(policy))
+        if not self.is_active():
+            self.scheduler.resync(time.ticks_ms())
+        queue = seg.animations.get(animation.channel)
+        if queue is None or policy != 'queue':
+            queue = []
+            seg.animations[animation.channel] = queue
+        queue.append(animation)
+
+    # Render the running animations of all segments, if a frame is due. While a segment is dithered, a frame is rendered with every tick of the scheduler
+    def tick(self):
+        if not self.is_active() and not self.is_dithering():
+            return False
+        now = time.ticks_ms()
+        if not self.scheduler.due(now):
+            return False
+        # All changes of this frame are written with one show()
+        self._rendering = True
+        try:
+            for seg in self.segments:
+                for queue in seg.animations.values():
+                    if queue:
+                        # A failing animation is dropped, the others and the loop of the caller go on
+                        try:
+                            running = queue[0].step(now)
+                        except Exception as e:
+                            self.event.log('E', 'Animation %s on %s failed - %s', queue[0].name, seg.name, e)
+                            running = False
+                        if not running:
+                            queue.pop(0)
+            if self.dither:
+                self._phase = (self._phase + 1) & DITHER_MASK
+                for seg in self.segments:
+                    if seg.dithering and not seg.running('color'):
+                        seg.dither_frame(self._phase)
+        finally:
+            self._rendering = False
+        self.write()
+        self.scheduler.rendered(now)
+        return True
+
+    # Run a method on the render core, if it runs (returns True, if it is queued). Otherwise at once
+    def submit(self, name, *args, **kwargs):
+        if self.core:
+            return self.core.call(name, args, kwargs)
+        return getattr(self, name)(*args, **kwargs)
+
+    # Result of a method, run where the frames are rendered. On the render core, core 0 waits for its next pass (OSError after a timeout)
+    def query(self, name, *args, **kwargs):
+        if self.core:
+            return self.core.request(name, args, kwargs)
+        return getattr(self, name)(*args, **kwargs)
+
+    # Statistics of the strips, the power limiter, the animations and the scheduler, taken at once
+    def get_render_info(self):
+        return {
+            "strip": {fb.id: fb.get_info() for fb in self.outputs},
+            "power": self.get_power(),
+            "animations": self.get_animations(),
+            "render": self.scheduler.get_info()
+        }
+
+    # Stop all animations and the dithering, i.e. when a stream takes over
+    def hold(self):
+        for seg in self.segments:
+            seg.animations.clear()
+            seg.dithering = False
+
+    # Render all segments again with their color and level, i.e. after frames or a stream
+    def redraw(self):
+        for seg in self.segments:
+            seg.render()
+        self.show()
+
+    # Write the frame buffers to the strips. Inside of tick() this is done once at the end of the frame. Unchanged outputs are skipped
+    def show(self):
+        if not self._rendering:
+            self.write()
+
+    # Write all outputs, scaled by the power limiter
+    def write(self):
+        self._limit()
+        for fb in self.outputs:
+            fb.show()
+
+    # Estimated draw from the byte-sums of the outputs (no scan of the buffers). Above the budget, all outputs are scaled by the same factor
+    def _limit(self):
+        total = 0
+        for fb in self.outputs:
+            total += fb.sum
+        channels = total * self.ma_per_channel // 255
+        self.draw_ma = self.idle_ma + channels
+        if self.draw_ma > self.peak_ma:
+            self.peak_ma = self.draw_ma
+        scale = 256
+        # A black strip has nothing to scale, even if the idle draw alone is above the budget
+        if self.max_ma and channels and self.draw_ma > self.max_ma:
+            scale = max(0, (self.max_ma - self.idle_ma) * 256 // channels)
+        if (scale < 256) != self.limited:
+            self.limited = scale < 256
+            if self.limited:
+                self.limit_events += 1
+                self.event.log('W', 'Power limit: %d mA estimated, budget %d mA', self.draw_ma, self.max_ma)
+        for fb in self.outputs:
+            fb.set_scale(scale)
+
+    def get_power(self):
+        scale = self.fb.scale
+        return {
+            "budget_ma": self.max_ma, 
+            "draw_ma": self.draw_ma, 
+            "limited_ma": self.idle_ma + (self.draw_ma - self.idle_ma) * scale // 256, 
+            "peak_ma": self.peak_ma, 
+            "scale": scale * 100 // 256, 
+            "limit_events": self.limit_events
+        }
+
+    def is_active(self):
+        for seg in self.segments:
+            if seg.is_active():
+                return True
+        return False
+
+    def is_dithering(self):
+        if self.dither:
+            for seg in self.segments:
+                if seg.dithering:
+                    return True
+        return False
+
+    # Run all queued animations to the end
+    def finish(self):
+        while self.is_active():
+            if not self.tick():
+                time.sleep_ms(1)
+
+    def get_animations(self):
+        info = {"active": 0, "queued": 0, "frames_left": 0, "running": []}
+        for seg in self.segments:
+            for queue in seg.animations.values():
+                if queue:
+                    info["active"] += 1
+                    info["queued"] += len(queue) - 1
+                    info["running"].append(seg.name + '/' + queue[0].name)
+                    for anim in queue:
+                        info["frames_left"] += self.scheduler.frames_for(anim.ms_left)
+        return info
     
-    # set single pixel
+    # set single pixel. The pixel is changed until the next render of its segment
     def single(
             self, 
             color, 
@@ -189,16 +1061,58 @@ class LightControl:
         color = list(color)
         while len(color) < 4:
             color.append(0)
-        try:
-            self.np[segment] = (
-                int(color[0] * light_level),
-                int(color[1] * light_level),
-                int(color[2] * light_level),
-                int(color[3] * light_level)
-            )
-            self.np.write()
-        except IndexError:
-            pass
+        if 0 <= segment < self.pixel:
+            duty = GAMMA[int(light_level * 255 + 0.5)]
+            self.fb.put(segment, self.fb.pattern([(c * duty + 127) // 255 for c in color]))
+            for seg in self.segments:
+                if seg.fb is self.fb and seg.start <= segment < seg.end:
+                    seg.dithering = False
+            self.show()
+
+    # Output of a frame: id, index or None for the first output
+    def frame_output(self, output):
+        if output is None:
+            return self.fb
+        if isinstance(output, int):
+            if not 0 <= output < len(self.outputs):
+                raise ValueError('Unknown output: ' + str(output))
+            return self.outputs[output]
+        fb = self.get_output(output)
+        if fb is None:
+            raise ValueError('Unknown output: ' + str(output))
+        return fb
+
+    # Number of pixels frame() sets with these arguments, without changing the output.
+    # Raises ValueError for an unknown output and for data, that is empty or not whole pixels (runs of [count][pixel-bytes] with rle)
+    def frame_count(self, data, start=0, output=None, rle=False):
+        fb = self.frame_output(output)
+        size = fb.bpp + 1 if rle else fb.bpp
+        if not data:
+            raise ValueError('No pixel-bytes')
+        if len(data) % size:
+            raise ValueError('%d bytes are not a multiple of %d' % (len(data), size))
+        return fb.count(data, start, rle)
+
+    # Copy a frame to an output (id, index or None for the first output), without dimming. The pixel-bytes are in the wire order of the strip (GRB or GRBW).
+    # Animations in the overwritten range are stopped, otherwise they would paint over the frame with the next tick.
+    def frame(
+            self, 
+            data, 
+            start=0, 
+            output=None, 
+            rle=False
+            ):
+        fb = self.frame_output(output)
+        if rle:
+            count = fb.blit_rle(data, start)
+        else:
+            count = fb.blit(data, start)
+        for seg in self.segments:
+            if seg.fb is fb and seg.start < start + count and start < seg.end:
+                seg.animations.clear()
+                seg.dithering = False
+        self.show()
+        return count
 
     # set color by line animation
     def line(
@@ -208,120 +1122,433 @@ class LightControl:
             dir=0, 
             gap=1, 
             start=0,
+            policy='queue',
+            segment=None,
+            output=None
             ):
         
         """
-        Sets the color by a line-animation.
+        Sets the color by a line-animation. Returns immediately, the animation is rendered by tick().
 
         Parameter:
             color (list): Target-color in rgbw-list-format. A list with 4 objects is expected (e.g. [255,0,0,0]).
-            speed (int): Pause between the steps in ms.
-            dir (int): Direction of the line. 1=forward, 2=backwards.
+            speed (int): Duration of one step in ms. The animation takes speed * (number of leds / gap) ms.
+            dir (int): Direction of the line. 0=forward, 1=backwards.
             gap (int): Gap betwen the leds in the animation. 1=no gap.
-            start (int): start of the animation. 0=start on the first led.
+            start (int): start of the animation. 0=start on the first led (the last one for backwards).
+            policy (str): 'replace', 'queue' or 'blend'. See POLICIES.
+            segment (str): Name (or list of names) of the segments. None=all.
+            output (str): Id of the output. None=all.
         """
         
-        line = start
         color = list(color)
         while len(color) < 4:
             color.append(0)
-        if dir == 0:
-            while line < self.pixel: 
-                self.np[line] = (
-                    int(color[0] * self.level),
-                    int(color[1] * self.level),
-                    int(color[2] * self.level),
-                    int(color[3] * self.level)
-                )
-                self.np.write()
-                line += gap
-                time.sleep_ms(speed)
-        elif dir == 1:
-            while line > 0:
-                self.np[line] = (
-                    int(color[0] * self.level),
-                    int(color[1] * self.level),
-                    int(color[2] * self.level),
-                    int(color[3] * self.level)
-                )
-                self.np.write()
-                line -= gap
-                time.sleep_ms(speed)
-        self.cache = color
-        self.last_change = time.time()
-        self.needs_save = True
+        for seg in self.get_segments(segment, output):
+            if dir == 0:
+                leds = range(seg.start + start, seg.end, gap)
+            else:
+                leds = range(seg.end - 1 - start, seg.start - 1, -gap)
+            duration = len(leds) * speed
+            self.start(seg, Animation('line', 'color', self._line_frames(seg, color, leds, duration), duration), policy)
         return color
+
+    # Effects
+    def effect(
+            self, 
+            name, 
+            speed=10, 
+            palette=None, 
+            duration=0,
+            policy='replace',
+            segment=None,
+            output=None
+            ):
+        
+        """
+        Runs an effect on the device. Returns immediately, the effect is rendered by tick() until it is replaced by another color-animation.
+
+        Parameter:
+            name (str): 'breathing', 'rainbow', 'chase' or 'twinkle'. See EFFECTS.
+            speed (int): Duration of one step in ms. breathing: one breath = 256 steps, rainbow/chase: one pixel per step, twinkle: one spark = 64 steps.
+            palette (list): Colors of the effect in rgbw-list-format. Default is the color of the segment. Not used by rainbow.
+            duration (int): Runtime in ms. 0=endless. After the runtime, the segment is set back to its color.
+            policy (str): 'replace', 'queue' or 'blend'. See POLICIES.
+            segment (str): Name (or list of names) of the segments. None=all.
+            output (str): Id of the output. None=all.
+        """
+
+        if name not in EFFECTS:
+            raise ValueError('Unknown effect: ' + str(name))
+        speed = max(1, int(speed))
+        for seg in self.get_segments(segment, output):
+            colors = []
+            for color in palette or [seg.color]:
+                color = list(color)
+                while len(color) < 4:
+                    color.append(0)
+                colors.append(color)
+            if name == 'breathing':
+                frames = self._breathing_frames(seg, speed, colors, duration)
+            elif name == 'rainbow':
+                frames = self._scroll_frames(seg, speed, self._rainbow_color, duration)
+            elif name == 'chase':
+                frames = self._scroll_frames(seg, speed, lambda j, n, colors=colors: colors[j // 6 % len(colors)] if j // 3 % 2 == 0 else BLACK, duration)
+            else:
+                frames = self._twinkle_frames(seg, speed, colors, duration)
+            self.start(seg, Animation(name, 'color', frames, duration), policy)
+        return True
+
+    def _rainbow_color(self, j, n):
+        h = j * 256 // n * 3
+        return HUE[h], HUE[h + 1], HUE[h + 2], 0
+
+    # Ends an effect. Endless effects (duration 0) report no ms left
+    def _effect_end(self, seg, elapsed, duration):
+        if duration and elapsed >= duration:
+            seg._color = None
+            seg.render()
+            return True
+        return False
+
+    # One color for the whole segment, the brightness follows the SINE-table
+    def _breathing_frames(
+            self, 
+            seg, 
+            speed, 
+            colors, 
+            duration
+            ):
+        fb = seg.fb
+        order = fb.order
+        pattern = bytearray(fb.bpp)
+        cycle = speed * 256
+        elapsed = yield
+        while not self._effect_end(seg, elapsed, duration):
+            color = colors[elapsed // cycle % len(colors)]
+            duty = GAMMA[(int(seg.level * 255) * SINE[elapsed // speed & 255] + 127) // 255]
+            for i in range(fb.bpp):
+                pattern[order[i]] = (color[i] * duty + 127) // 255
+            fb.fill(pattern, seg.start, seg.end)
+            elapsed = yield duration - elapsed if duration else 0
+
+    # A pattern of the segment-length (source: pixel, length -> color), rendered once (and again only if the level changes) into a buffer of twice the length.
+    # A frame is one copy of a window of this buffer, the window moves one pixel per step.
+    def _scroll_frames(
+            self, 
+            seg, 
+            speed, 
+            source, 
+            duration
+            ):
+        fb = seg.fb
+        bpp = fb.bpp
+        n = seg.size()
+        strip = bytearray(2 * n * bpp)
+        mv = memoryview(strip)
+        level = -1
+        elapsed = yield
+        while not self._effect_end(seg, elapsed, duration):
+            if seg.level != level:
+                level = seg.level
+                duty = GAMMA[int(level * 255 + 0.5)]
+                for j in range(n):
+                    color = source(j, n)
+                    fb.pattern([(color[i] * duty + 127) // 255 for i in range(bpp)], mv[j * bpp:(j + 1) * bpp])
+                strip[n * bpp:] = strip[:n * bpp]
+            k = n - 1 - elapsed // speed % n
+            fb.blit(mv[k * bpp:(k + n) * bpp], seg.start)
+            elapsed = yield duration - elapsed if duration else 0
+
+    # Random pixels light up and fade out (SINE-table). Only the sparks are rendered: one per 8 pixels, max. 16
+    def _twinkle_frames(
+            self, 
+            seg, 
+            speed, 
+            colors, 
+            duration
+            ):
+        from random import getrandbits
+        fb = seg.fb
+        order = fb.order
+        n = seg.size()
+        slots = max(1, min(16, n // 8))
+        spark = speed * 64
+        pos = [getrandbits(16) % n for _ in range(slots)]
+        col = [0] * slots
+        born = [-(s * spark // slots) for s in range(slots)]
+        pixel = bytearray(fb.bpp)
+        black = bytearray(fb.bpp)
+        fb.fill(black, seg.start, seg.end)
+        elapsed = yield
+        while not self._effect_end(seg, elapsed, duration):
+            level = int(seg.level * 255)
+            for s in range(slots):
+                age = elapsed - born[s]
+                if age >= spark:
+                    fb.put(seg.start + pos[s], black)
+                    pos[s] = getrandbits(16) % n
+                    col[s] = getrandbits(8) % len(colors)
+                    born[s] = elapsed
+                    age = 0
+                duty = GAMMA[(level * (255 - SINE[age * 256 // spark]) + 127) // 255]
+                color = colors[col[s]]
+                for i in range(fb.bpp):
+                    pixel[order[i]] = (color[i] * duty + 127) // 255
+                fb.put(seg.start + pos[s], pixel)
+            self.show()
+            elapsed = yield duration - elapsed if duration else 0
+
+    def _line_frames(
+            self, 
+            seg, 
+            color, 
+            leds, 
+            duration
+            ):
+        count = len(leds)
+        done = 0
+        level = seg.level
+        seg.dim_color(color, level)
+        pattern = bytearray(seg.pattern)
+        elapsed = yield
+        seg.dithering = False
+        while True:
+            # The level was changed (i.e. by a dim): the segment and the drawn part of the line again, with the new level
+            if seg.level != level:
+                level = seg.level
+                seg.dim_color(seg.color, level)
+                seg.fb.fill(seg.pattern, seg.start, seg.end)
+                seg.dim_color(color, level)
+                pattern[:] = seg.pattern
+                seg.fb.put_pixels(leds, 0, done, pattern)
+                self.show()
+            upto = count if elapsed >= duration else count * elapsed // duration
+            if upto > done:
+                seg.fb.put_pixels(leds, done, upto, pattern)
+                done = upto
+                self.show()
+            if done >= count:
+                break
+            elapsed = yield duration - elapsed
+        # A line over the whole segment is its new color, otherwise the pixels are not dithered any more
+        if count == seg.size():
+            seg.render(color)
+        else:
+            seg.color = color
+            seg.dithering = False
+        self.needs_save = True
     
     # set Color by soft transition
     def set_smooth(
             self, 
             target_color, 
             speed=10, 
-            steps=50
+            steps=50,
+            policy='replace',
+            segment=None,
+            output=None,
+            easing='linear'
             ):
         
         """
-        Change the color by smooth transition.
+        Change the color by smooth transition. Returns immediately, the animation is rendered by tick().
         
         Parameters:
             target_color(list): A list with 4 integer objects with the color-value (R,G,B,W | 0...255). At least one value is needed. If one is missing (i.e. W), only the given colors are set (255,255 -> 255,255,0,0).
-            speed(int): Pause between steps in ms. 10 is default.
+            speed(int): Duration of one step in ms. 10 is default. The transition takes speed * steps ms.
             steps(int): Transition steps between pause. 50 is recommended to run a smooth animation.
+            policy(str): 'replace', 'queue' or 'blend'. See POLICIES. The transition always starts from the color on the strip.
+            segment(str): Name (or list of names) of the segments. None=all.
+            output(str): Id of the output. None=all.
+            easing(str): Curve of the transition: 'linear', 'ease' (ease-in-out) or 'exp' (exponential). See EASING.
             """
         
-        current = list(self.cache) # type: ignore
+        if easing not in EASING:
+            raise ValueError('Unknown easing: ' + str(easing))
         target = list(target_color)
         
         while len(target) < 4:
             target.append(0)
         
-        for step in range(1, steps + 1):
-            intermediate = [
-                int(current[i] + (target[i] - current[i]) * step / steps)
-                for i in range(4) 
-            ]
+        for seg in self.get_segments(segment, output):
+            duration = steps * speed
+            running = seg.running('color')
+            if policy == 'blend' and running:
+                duration = running.ms_left
+            self.start(seg, Animation('smooth', 'color', self._smooth_frames(seg, target, duration, EASING[easing]), duration), policy)
+        return target
+
+    # Fixed-point transition: color and dim-level are combined into one factor and one delta per channel, computed once (and again only if the level changes).
+    # A frame is then one multiply-add-shift per channel into the pattern of the segment, without new objects.
+    #   byte = (base + delta * w) >> 16, w = eased progress (0...256), base = color * 256 * duty, delta = (target - color) * duty, duty = 0...256
+    def _smooth_frames(
+            self, 
+            seg, 
+            target, 
+            duration,
+            curve
+            ):
+        # Otherwise the pixels would snap to the color of the segment with the first frame
+        if not seg.shows_color():
+            yield from self._sampled_frames(seg, target, duration, curve)
+            return
+        seg.color = color = list(seg.color)
+        start = color[:]
+        order = seg.fb.order
+        bpp = seg.fb.bpp
+        base = [0] * bpp
+        delta = [0] * bpp
+        pattern = seg.pattern
+        level = -1
+        elapsed = yield
         
-            self.static(intermediate, self.level)
-            time.sleep_ms(speed)
+        while elapsed < duration:
+            if seg.level != level:
+                level = seg.level
+                duty = GAMMA[int(level * 255 + 0.5)]
+                duty += duty >> 7
+                for i in range(bpp):
+                    base[order[i]] = start[i] * duty * 256 + 32768
+                    delta[order[i]] = (target[i] - start[i]) * duty
+            w = curve[elapsed * 255 // duration]
+            w += w >> 7
+            for i in range(bpp):
+                pattern[i] = (base[i] + delta[i] * w) >> 16
+            for i in range(4):
+                color[i] = start[i] + (((target[i] - start[i]) * w) >> 8)
+            seg._color = None
+            seg.fb.fill(pattern, seg.start, seg.end)
+            elapsed = yield duration - elapsed
         
-        self.cache = target
-        self.last_change = time.time()
+        seg.render(target)
+        self.needs_save = True
+
+    # Transition from the pixels on the strip, when they are not one color (i.e. a line was replaced half-way).
+    # Per pixel-byte: byte = start + (goal - start) * w >> 8, goal = dimmed target. Slower than _smooth_frames, only used at such a start
+    def _sampled_frames(
+            self, 
+            seg, 
+            target, 
+            duration,
+            curve
+            ):
+        fb = seg.fb
+        bpp = fb.bpp
+        start = bytes(fb.buf[seg.start * bpp:seg.end * bpp])
+        out = bytearray(len(start))
+        goal = bytearray(bpp)
+        level = -1
+        elapsed = yield
+
+        while elapsed < duration:
+            if seg.level != level:
+                level = seg.level
+                seg.dim_color(target, level)
+                goal[:] = seg.pattern
+            w = curve[elapsed * 255 // duration]
+            w += w >> 7
+            for p in range(0, len(out), bpp):
+                for i in range(bpp):
+                    s = start[p + i]
+                    out[p + i] = s + (((goal[i] - s) * w) >> 8)
+            fb.blit(out, seg.start)
+            elapsed = yield duration - elapsed
+
+        seg.render(target)
         self.needs_save = True
-        return target
 
+    # Saved in the LightControl_settings of the config-file, where __init__ (and main.py for the boot frame) reads it
     def change_autostart(self, value):
-        self.status.save_param(param='autostart', new_value=value)
+        self.autostart = bool(value)
+        try:
+            self.settings.save_param('LightControl_settings', 'autostart', self.autostart)
+        except AttributeError:
+            pass
+        if not self.autostart:
+            boot_frame.remove(self.frame_file)
     
     def change_pixel_qty(self, value):
         self.status.save_param(param='led_qty', new_value=value)
     
     def get_info(self):
-        return {"version": version, "led_qty": self.pixel_qty, "led_pin": self.led_pin, "color": self.cache, "light_level": self.dim_status}
+        return {
+            "version": version, 
+            "led_qty": self.pixel_qty, 
+            "led_pin": self.led_pin, 
+            "outputs": [fb.id for fb in self.outputs],
+            "color": self.cache, 
+            "light_level": int(self.level * 100), 
+            "segments": {seg.name: seg.get_info() for seg in self.segments},
+            "animations": self.get_animations(), 
+            "render": self.scheduler.get_info(), 
+            "power": self.get_power(),
+            "strip": {fb.id: fb.get_info() for fb in self.outputs},
+            "status": self.status.get_info()
+        }
     
+    # Hand the changed state to the journal, it is written once after save_delay without a change (one write per slider-drag).
+    # force: write it now, i.e. before a reset. Runs on core 0: with the render core, the state is a snapshot published by core 1 (see snapshot())
     def check_save(self, force=False):
-        if force or (self.need_save and (time.time() - self.last_change) > 5):
-            self.status.save_param(param='color', new_value=self.cache)
-            self.status.save_param(param='dim_status', new_value=int(self.level * 100))
-            self.need_save = False
-
-# Auto-initialize LEDs
-LC = LightControl()
-
-"""
-def set_smooth(self, target_color, speed=10, steps=50):
-    current = list(self.cache)
-    target = list(target_color)
-    while len(target) < 4: target.append(0)
-    
-    # Vorbereiten der Differenzen spart Rechenzeit in der Schleife
-    diffs = [target[i] - current[i] for i in range(4)]
-    
-    for step in range(1, steps + 1):
-        # Ganzzahl-Arithmetik für Geschwindigkeit
-        intermediate = [
-            int(current[i] + (diffs[i] * step // steps))
-            for i in range(4)
-        ]
-        self.static(intermediate, self.level)
-        time.sleep_ms(speed)
-"""
\ No newline at end of file
+        writes = self.status.writes
+        state = None
+        if self.core:
+            item = self.core.states.get()
+            while item is not None:
+                state = item
+                item = self.core.states.get()
+            if force:
+                try:
+                    state = self.core.request('snapshot')
+                except OSError as e:
+                    self.event0.log('W', 'No snapshot of the render core - %s', e)
+        elif self.needs_save or force:
+            state = self.snapshot()
+        if state:
+            values, self._frame = state
+            # force: all values in one record of the journal at the end of the batch, with the changes still waiting for the debounce
+            save = self.status.save_param if force else self.status.set
+            with self.status.batch():
+                for param in values:
+                    save(param=param, new_value=values[param])
+        self.status.tick()
+        if self.status.writes != writes and self.autostart and self._frame:
+            self.save_frame()
+
+    # Copies of the values of the status-file and of the raw frame of all outputs, as the strips show it (scaled by the power limiter).
+    # Taken where the frames are rendered, so nothing is half changed: on core 1, if the render core runs
+    def snapshot(self):
+        self.needs_save = False
+        values = {"color": list(self.cache), "dim_status": int(self.level * 100)}
+        if len(self.segments) > 1:
+            values["segments"] = {seg.name: [list(seg.color), int(seg.level * 100)] for seg in self.segments}
+        frame = None
+        if self.autostart:
+            frame = [(pin, fb.bpp, bytes(fb._scaled if fb.scale < 256 else fb.buf)) for pin, fb in zip(self.pins, self.outputs)]
+        return values, frame
+
+    # Frame of the last snapshot for the fast boot. Not written again, if the file holds the same frame
+    def save_frame(self):
+        try:
+            boot_frame.save(self._frame, self.frame_file)
+        except OSError as e:
+            self.event0.log('E', 'Frame not saved - %s', e)
+
+# How a new animation treats the running one on the same channel:
+# replace: the running and queued animations are dropped. The new one starts from the state on the strip.
+# queue: the new animation starts when the others on the channel are done.
+# blend: like replace, but the new animation takes over the frames left of the running one, so the transition does not get longer.
+POLICIES = ('replace', 'queue', 'blend')
+
+# Effects of effect(). They run on the 'color'-channel until they are replaced
+EFFECTS = ('breathing', 'rainbow', 'chase', 'twinkle')
+BLACK = (0, 0, 0, 0)
+
+# The LightControl of the device. Created with the first access of LightControl.LC (or 'from LightControl import LC'),
+# not at the import. main.py creates it right after the boot frame, so the autostart is the first stage
+def __getattr__(name):
+    global LC
+    if name == 'LC':
+        LC = LightControl()
+        return LC
+    raise AttributeError(name)
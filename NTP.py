@@ -1,6 +1,8 @@
 # Time setting via NTP-Server
+# The ClockService syncs the RTC once at boot and then periodically from the main loop.
+# Between the syncs the measured drift is used to discipline the RTC, so reading the time never needs a network round trip.
 
-Version = '1.1'
+Version = '1.6'
 
 import machine
 import utime as time
@@ -8,51 +10,195 @@ import usocket as socket
 import ustruct as struct
 from json_config_parser import config
 
-# Load time-settings from JSON
-time_setting    = config('/params/time_setting.json', layers=1)
-GMT_winter      = time_setting.get(param='use_winter_time') # type: ignore
-offline_time    = time_setting.get(param='offline_time') # type: ignore
+# Time-settings from JSON, loaded with the first NTP-query (not at the import).
+# Shared with order.change_GMT_time, so a change is used by the next sync
+time_setting    = None
 
-def save_time(time):
-    time_setting.save_param('offline_time', time)
+def load_settings():
+    global time_setting
+    if time_setting is None:
+        time_setting = config('/params/time_setting.json', layers=1)
+    return time_setting
 
 # Winterzeit / Sommerzeit
-if GMT_winter == True:
-    GMT_OFFSET = 3600 * 1 # 3600 = 1 h (Winterzeit)
-else:
-    GMT_OFFSET = 3600 * 2 # 3600 = 1 h (Sommerzeit)
+def gmt_offset():
+    if load_settings().get(param='use_winter_time') == True:
+        return 3600 * 1 # 3600 = 1 h (Winterzeit)
+    return 3600 * 2 # 3600 = 1 h (Sommerzeit)
+
+def save_time(time):
+    load_settings().save_param(param='offline_time', new_value=time)
 
 NTP_HOST = 'pool.ntp.org'
 
-def getTimeNTP():
+# Number of NTP-queries sent since boot
+ntp_queries = 0
+
+# Query the NTP-server. Returns (local seconds, microseconds of the fraction, round trip in us).
+# The fraction (bytes 44...47, 1/2^32 s) is corrected by half the round trip, i.e. it is the time at the receipt of the answer
+def queryNTP():
+    global ntp_queries
     NTP_DELTA = 2208988800
     NTP_QUERY = bytearray(48)
     NTP_QUERY[0] = 0x1B
+    ntp_queries += 1
     addr = socket.getaddrinfo(NTP_HOST, 123)[0][-1]
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
         s.settimeout(1)
+        sent = time.ticks_us()
         res = s.sendto(NTP_QUERY, addr)
         msg = s.recv(48)
+        rtt = time.ticks_diff(time.ticks_us(), sent)
     finally:
         s.close()
-    ntp_time = struct.unpack("!I", msg[40:44])[0]
-    return time.gmtime(ntp_time - NTP_DELTA + GMT_OFFSET)
+    ntp_time, fraction = struct.unpack("!II", msg[40:48])
+    us = (fraction * 1000000 >> 32) + rtt // 2
+    return ntp_time - NTP_DELTA + gmt_offset() + us // 1000000, us % 1000000, rtt
 
-def setTimeRTC():
-    tm = getTimeNTP()
+def getTimeNTP():
+    return time.gmtime(queryNTP()[0])
+
+def _set_rtc(tm):
     machine.RTC().datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], 0))
+
+def setTimeRTC():
+    _set_rtc(getTimeNTP())
     #mt = machine.RTC().datetime()
     #Log('adjusted machine Time from NTP-Server')
     #print('adjusted machine Time from NTP-Server')
 
+class ClockService:
+    def __init__(
+            self,
+            interval=3600,
+            min_interval=900,
+            max_interval=86400,
+            max_offset=1
+            ):
+        
+        """
+        Parameters:
+            interval (int): Initial time between two NTP-syncs in s.
+            min_interval (int): Lower bound for the sync-interval in s.
+            max_interval (int): Upper bound for the sync-interval in s.
+            max_offset (int): Offset in s up to which the clock counts as stable. The interval is doubled while the offset stays below, halved otherwise.
+
+        Methods:
+        --------
+            sync(): queries the NTP-server and sets the RTC. Call once at boot, after the wifi is connected.
+            tick(): call in the main loop. Runs the periodic sync and corrects the drift between the syncs.
+            now(): returns (seconds, microseconds) from the RTC without any network access.
+            timestamp(): returns the formatted time with microseconds.
+            get_info(): returns the sync-statistics.
+        """
+
+        self.interval       = interval
+        self.min_interval   = min_interval
+        self.max_interval   = max_interval
+        self.max_offset     = max_offset
+
+        self.synced     = False
+        self.failures   = 0
+        self.offset     = 0     # Offset between RTC and NTP at the last sync in s (with us)
+        self.drift_ppm  = 0     # Measured drift of the RTC
+        self.last_sync  = 0     # RTC-time of the last successful sync
+        self.last_try   = None  # ticks_ms of the last sync attempt
+
+        # Drift correction between the syncs
+        self._drift_acc = 0
+        self._drift_chk = 0
+
+        # Sub-second resolution: ticks_us at the last seen change of the RTC-second
+        self._second    = 0
+        self._edge_us   = time.ticks_us()
+
+    def sync(self):
+        self.last_try = time.ticks_ms()
+        try:
+            ntp_s, ntp_frac, rtt = queryNTP()
+        except Exception:
+            self.failures += 1
+            return False
+
+        # Compared in us: the RTC counts whole seconds, now_us() adds the ticks since its last second
+        offset = ntp_s * 1000000 + ntp_frac - self.now_us()
+
+        if self.synced:
+            elapsed = ntp_s - self.last_sync
+            # Below the round trip (and the ms of the sub-second edge) the offset is only noise of the measurement
+            if elapsed > 0 and abs(offset) > rtt + 1000:
+                # Offset that is left over after the correction of the last interval
+                self.drift_ppm += offset // elapsed
+            if abs(offset) <= self.max_offset * 1000000:
+                self.interval = min(self.interval * 2, self.max_interval)
+            else:
+                self.interval = max(self.interval // 2, self.min_interval)
+
+        _set_rtc(time.gmtime(ntp_s))
+        self.offset     = offset / 1000000
+        self.last_sync  = ntp_s
+        self.synced     = True
+        self._drift_acc = 0
+        self._drift_chk = ntp_s
+        self._second    = ntp_s
+        self._edge_us   = time.ticks_add(time.ticks_us(), -ntp_frac)
+        return True
+
+    def tick(self):
+        now_s = self.now()[0]
+        
+        # Periodic sync. Retry after min_interval if the last attempt failed
+        wait = self.interval if self.synced else self.min_interval
+        if self.last_try is None or time.ticks_diff(time.ticks_ms(), self.last_try) > wait * 1000:
+            self.sync()
+            return
+
+        # Step the RTC by one second each time the expected drift adds up to it
+        if self.drift_ppm and now_s != self._drift_chk:
+            self._drift_acc += (now_s - self._drift_chk) * self.drift_ppm
+            self._drift_chk = now_s
+            if abs(self._drift_acc) >= 1000000:
+                step = 1 if self._drift_acc > 0 else -1
+                self._drift_acc -= step * 1000000
+                _set_rtc(time.localtime(now_s + step))
+                self._drift_chk += step
+                self._second    += step
+
+    def now(self):
+        s = time.time()
+        t = time.ticks_us()
+        if s != self._second:
+            self._second = s
+            self._edge_us = t
+            return s, 0
+        us = time.ticks_diff(t, self._edge_us)
+        return s, min(us, 999999)
+
+    def now_us(self):
+        s, us = self.now()
+        return s * 1000000 + us
+
+    def timestamp(self):
+        s, us = self.now()
+        tm = time.localtime(s)
+        return '%04d-%02d-%02d|%02d:%02d:%02d.%06d' % (tm[0], tm[1], tm[2], tm[3], tm[4], tm[5], us)
+
+    def get_info(self):
+        return {
+            "synced": self.synced,
+            "ntp_queries": ntp_queries,
+            "failures": self.failures,
+            "offset": self.offset,
+            "drift_ppm": self.drift_ppm,
+            "interval": self.interval
+        }
+
+clock = ClockService()
+
+# Formatted time from the disciplined RTC. No NTP-query is made here.
 def timestamp():
-    try:
-        setTimeRTC()
-    except:
-        pass
-    tm = machine.RTC().datetime()
-    return str(tm[0])+'-'+str(tm[1])+'-'+str(tm[2])+'|'+str(tm[4])+':'+str(tm[5])+':'+str(tm[6])
+    return clock.timestamp()
 
 def getTimeRTC():
     setTimeRTC()
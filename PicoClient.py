@@ -1,29 +1,23 @@
 # MQTT Client Module
 # New Version with separate MQTT-Handler
 # There are 3 topics used, one for incoming order, one for configuration and one for the status from pico. config and status are for publishing message
+# Binary pixel-frames are received on the frame-topic (see order.run_frame) and, if enabled in the Stream-config, as UDP-stream (see udp_stream)
 # The incoming orders are processed and executed by order.py and the answer is published to the status-topic
 # Settings stored in config.json
 
-version = '6.4.1a'
+version = '6.10.0'
 
 import utime as time
 from mqtt_handler import MQTTHandler
-from PicoWifi import led_onboard, check_status, is_pico
+import PicoWifi
+from PicoWifi import check_status, is_pico
 from json_config_parser import config
-from logger import Log
-
-# load settings from the config file
-settings        = config('/params/config.json')
-mqttClient      = settings.get('MQTT-config', 'Client')
-mqttBroker      = settings.get('MQTT-config', 'Broker')
-mqttPort        = settings.get('MQTT-config', 'Port')
-mqttUser        = settings.get('MQTT-config', 'User')
-mqttPW          = settings.get('MQTT-config', 'PW')
-
-try:
-    publish_in_Json = settings.get('MQTT-config', 'publish_in_json')
-except KeyError:
-    publish_in_Json = False
+import logger
+from NTP import clock
+import LightControl
+from order import run_frame
+import udp_stream
+import render_core
 
 # Set the LED-Timer depending on the platform (pico or not)
 if is_pico:
@@ -37,13 +31,50 @@ last_msg    = time.time()
 wd_counter  = 0
 watchdog_last_chk = 0
 
-mqtt = MQTTHandler(
-    client_id=mqttClient,
-    broker=mqttBroker,
-    user=mqttUser,
-    password=mqttPW,
-    pinjson=publish_in_Json # type: ignore
-)
+event = logger.Create('MQTT')
+wd_event = logger.Create('Watchdog')
+
+# UDP-stream and render loop on core 1, created in go() if enabled
+stream = None
+core = None
+
+# Settings, MQTT-handler and the LightControl are set up by init(), called by go(). Importing the module does not load them
+_ready = False
+
+def init():
+    global _ready, settings, mqttClient, mqttBroker, mqttPort, mqttUser, mqttPW, publish_in_Json, mqtt, led_onboard, LC
+    if _ready:
+        return
+    _ready = True
+
+    # load settings from the config file
+    settings        = config('/params/config.json')
+    mqttClient      = settings.get('MQTT-config', 'Client')
+    mqttBroker      = settings.get('MQTT-config', 'Broker')
+    mqttPort        = settings.get('MQTT-config', 'Port')
+    mqttUser        = settings.get('MQTT-config', 'User')
+    mqttPW          = settings.get('MQTT-config', 'PW')
+
+    try:
+        publish_in_Json = settings.get('MQTT-config', 'publish_in_json')
+    except KeyError:
+        publish_in_Json = False
+
+    mqtt = MQTTHandler(
+        client_id=mqttClient,
+        broker=mqttBroker,
+        user=mqttUser,
+        password=mqttPW,
+        pinjson=publish_in_Json # type: ignore
+    )
+    led_onboard = PicoWifi.led_onboard
+    LC = LightControl.LC
+
+def __getattr__(name):
+    if not _ready and name in ('settings', 'mqttClient', 'mqttBroker', 'mqttPort', 'mqttUser', 'mqttPW', 'publish_in_Json', 'mqtt', 'led_onboard', 'LC'):
+        init()
+        return globals()[name]
+    raise AttributeError(name)
 
 # Watchdog-function to check if connection still up
 def watchdog(
@@ -60,13 +91,13 @@ def watchdog(
 
     if pico_time - last_msg > watch_time:
         wd_counter += 1
-        Log('Watchdog', f'[ INFO  ]: Counter: {wd_counter} | RTC-Time={pico_time} | Last msg={last_msg}')
+        wd_event.log('I', 'Counter: %s | RTC-Time=%s | Last msg=%s', wd_counter, pico_time, last_msg)
         
         last_msg = pico_time 
         watchdog_last_chk = pico_time
 
         if wd_counter % 2 == 0:
-            Log('Watchdog', '[ CHECK ]: Very quiet here. Checking connection...')
+            wd_event.log('I', 'Very quiet here. Checking connection...')
             
             mqtt.publish(f'{mqttClient}/status', {"msg": "echo", "is_err_msg": False, "origin": "watchdog"})
             mqtt.set_rec(False)
@@ -75,13 +106,13 @@ def watchdog(
                 mqtt.check_msg()
                 state = mqtt.get_rec()
                 if state:
-                    Log('Watchdog', '[ CHECK ]: Connection still up!')
+                    wd_event.log('I', 'Connection still up!')
                     break
                 time.sleep_ms(timeout_pause)
             if not state:
-                Log('Watchdog', '[ FAIL  ]: Message wait timeout. Probably connection lost')
+                wd_event.log('E', 'Message wait timeout. Probably connection lost')
                 if not check_status():
-                    Log('Watchdog', '[ FAIL  ]: No Connection to Wifi. See Wifi.log for details!')
+                    wd_event.log('E', 'No Connection to Wifi. See Wifi.log for details!')
                 mqtt.reconnect()
     return True
 
@@ -98,20 +129,38 @@ def led_toggle(onTime=led_timer):
     
 # Main - just call go() to start the Loop
 def go():
+    global stream, core
+    init()
+    if stream is None:
+        stream = udp_stream.start(LC, settings)
+    if core is None:
+        core = render_core.start(LC, stream)
+
     while True:
         if not mqtt.connect():
             time.sleep(5)
             continue
 
         mqtt.subscribe(f'{mqttClient}/order')
+        mqtt.subscribe_binary(f'{mqttClient}/frame', run_frame)
         
         try:
             while True:
                 led_toggle()
                 mqtt.check_msg()
+                if core:
+                    core.service()
+                else:
+                    LC.tick()
+                if stream:
+                    stream.poll()
+                LC.check_save()
+                mqtt.service()
                 watchdog()
+                clock.tick()
+                logger.tick()
         
         except Exception as e:
-            Log('MQTT', f'[ FAIL ]: MQTT connection lost! - {e}')
+            event.log('E', 'MQTT connection lost! - %s', e)
             mqtt.reconnect()
     
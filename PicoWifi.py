@@ -1,35 +1,59 @@
 # Wifi network module for Prapberry pi pico and ESP-32
 # configuration stored in JSON-File
 # works with micropython v1.21.0 and higher
-version = '6.4.0'
+version = '6.6.0'
 
 import utime as time
 import network, machine
+import json_config_parser
 from json_config_parser import config
-from logger import Log
+import logger
 from Led_controller import LedController
 import sys
 
-# Get configuration
-settings    = config('/params/config.json')
-wlanSSID    = settings.get('Wifi-config', 'SSID')
-wlanPW      = settings.get('Wifi-config', 'PW')
-wlanName    = settings.get('Wifi-config', 'Hostname')
-
-led_active  = settings.get('Wifi-config', 'led_active')
-led_set = {
-    'onboard_led': settings.get('Wifi-config', 'onboard_led'), 
-    'led_inverted': settings.get('Wifi-config', 'led_inverted')
-    }
+event = logger.Create('WIFI')
 
 # check if pico is used or not
 is_pico = sys.platform == 'rp2'
 
-# Get the Broker-IP to perform later Network-check
-test_host   = settings.get('MQTT-config', 'Broker')
+# Configuration, onboard-LED and WLAN are created by init() on first use, not at the import.
+# init() is called by connect(), or by the first access of i.e. PicoWifi.led_onboard from another module
+_ready = False
+
+def init():
+    global _ready, settings, wlanSSID, wlanPW, wlanName, test_host, led_onboard, wlan, wlan_ready
+    if _ready:
+        return
+    _ready = True
+
+    # Get configuration
+    settings    = config('/params/config.json')
+    wlanSSID    = settings.get('Wifi-config', 'SSID')
+    wlanPW      = settings.get('Wifi-config', 'PW')
+    wlanName    = settings.get('Wifi-config', 'Hostname')
+
+    led_active  = settings.get('Wifi-config', 'led_active')
+    led_set = {
+        'onboard_led': settings.get('Wifi-config', 'onboard_led'), 
+        'led_inverted': settings.get('Wifi-config', 'led_inverted')
+        }
+
+    # Get the Broker-IP to perform later Network-check
+    test_host   = settings.get('MQTT-config', 'Broker')
 
-led_onboard = LedController(is_pico, led_set)
-led_onboard.set_active(led_active) # type: ignore
+    led_onboard = LedController(is_pico, led_set)
+    led_onboard.set_active(led_active) # type: ignore
+
+    # Ensure that wifi is ready: connect() waits until 2 s after the start of the chip, the boot goes on meanwhile
+    led_onboard.off()
+    wlan = network.WLAN(network.STA_IF)
+    wlan_ready = time.ticks_add(time.ticks_ms(), 2000)
+
+def __getattr__(name):
+    if not _ready and name in ('settings', 'wlanSSID', 'wlanPW', 'wlanName', 'test_host', 'led_onboard', 'wlan', 'wlan_ready'):
+        init()
+        return globals()[name]
+    raise AttributeError(name)
 
 # wlan-status codes
 ERROR_CODES = {
@@ -42,21 +66,18 @@ ERROR_CODES = {
     -3: 'LINK_BADAUTH'
 }
 
-# Ensure that wifi is ready
-led_onboard.off()
-time.sleep(2)
-wlan = network.WLAN(network.STA_IF)
-
 # Handling of WLAN-Status-Codes
 def error_handling(errorno):
     return ERROR_CODES.get(errorno, 'UNKNOWN_ERROR')
 
 # Save IP-Adress in JSON-File
 def saveIP(ip):
+    init()
     settings.save_param('Wifi-config', 'IP', ip)
 
 # Flash-Funktion of Onboard-LED
 def led_flash(on=1000, off=0):
+    init()
     led_onboard.on()
     time.sleep_ms(on)
     led_onboard.off()
@@ -65,17 +86,21 @@ def led_flash(on=1000, off=0):
 # Connect to the Network with a number of max attempts
 def connect(max_attempts=5):
     global wlan
+    init()
     if is_pico:
         import rp2
         rp2.country = settings.get('Wifi-config', 'country')
         network.hostname(wlanName)
         wlan.config(pm=0xa11140)
+    wait = time.ticks_diff(wlan_ready, time.ticks_ms())
+    if wait > 0:
+        time.sleep_ms(wait)
     attempts = 0
 
     # Try to connect. Increase Max attempts when connection fails
     while attempts < max_attempts:
         if not wlan.isconnected():
-            Log('WIFI', f'[ INFO  ]: Connecting to {wlanSSID} ...')
+            event.log('I', 'Connecting to %s ...', wlanSSID)
             wlan.active(False)
             time.sleep(0.5)
             wlan.active(True)
@@ -83,29 +108,31 @@ def connect(max_attempts=5):
             if not wlan.isconnected():
                 wstat = error_handling(wlan.status())
                 if wstat == 'LINK_BADAUTH':
-                    Log('WIFI', '[ FAIL ]: Wifi authentication failed! Probably wrong password!')
+                    event.log('E', 'Wifi authentication failed! Probably wrong password!')
                     return
                 elif wstat == 'LINK_UP':
                     break
                 if wstat == 'LINK_JOIN':
-                    Log('WIFI', f'[ INFO  ]: Connection not yet established | status: {wstat}, still trying...')
+                    event.log('I', 'Connection not yet established | status: %s, still trying...', wstat)
                 else:
-                    Log('WIFI', f'[ WARN  ]: Connection failed during startup | status: {wstat}, retrying...')
+                    event.log('W', 'Connection failed during startup | status: %s, retrying...', wstat)
                 led_flash(500, 1000)
         if wlan.isconnected():
             led_onboard.on()
-            Log('WIFI', '[ INFO  ]: Connected!')
+            event.log('I', 'Connected!')
             w_status = wlan.ifconfig()
-            Log('WIFI', '[ INFO  ]: IP = ' + w_status[0])
+            event.log('I', 'IP = %s', w_status[0])
             saveIP(w_status[0])
             return
         else:
-            Log('WIFI', f'[ FAIL  ]: {attempts}: Connection failed! Status: {wstat}, | retrying...')
+            event.log('E', '%s: Connection failed! Status: %s, | retrying...', attempts, wstat)
             attempts += 1
     
     # Log failed connection after maximum retries was reached. Then reboot.
-    Log('WIFI', f'[ FAIL  ]: Maximum retry attempts ({max_attempts}) reached. Connection failed.')
-    Log('WIFI', '[ INFO  ]: Maybe something wrong with the wifi-chip. Will now reboot...')
+    event.log('E', 'Maximum retry attempts (%s) reached. Connection failed.', max_attempts)
+    event.log('I', 'Maybe something wrong with the wifi-chip. Will now reboot...')
+    json_config_parser.flush_all()
+    logger.flush()
     machine.reset()
 
 # Check Wifi connection status. If not successful, try to reconnect.
@@ -116,22 +143,25 @@ def check_status(
     
     import socket
     global wlan
+    init()
     try:
         s = socket.socket()
         s.settimeout(timeout)
         s.connect((test_host, 1883))
         s.close()
-        Log('WIFI', '[ INFO  ]: Successfully tested network connection!')
+        event.log('I', 'Successfully tested network connection!')
         return True
     except Exception as e:
-        Log('WIFI', '[ FAIL  ]: Wifi connection lost - ' + str(e))
+        event.log('E', 'Wifi connection lost - %s', e)
         if retries > 0:
-            Log('WIFI', '[ INFO  ]: Retrying connection...')
-            Log('WIFI', '[ INFO  ]: Number of retries: ' + str(retries))
+            event.log('I', 'Retrying connection...')
+            event.log('I', 'Number of retries: %s', retries)
             retries -=1
             led_flash(on=500, off=500)
             led_flash(on=500, off=500)
             connect() 
         else:
-            Log('WIFI', '[ FAIL  ]: Failed to reconnect after several attempts. Will reboot now...')
+            event.log('E', 'Failed to reconnect after several attempts. Will reboot now...')
+            json_config_parser.flush_all()
+            logger.flush()
             machine.reset()
@@ -0,0 +1,150 @@
+# Fast boot: the last rendered frame is written to the strips straight from a raw file, before wifi, NTP and the config are loaded.
+# The file is written by LightControl, when the status is saved and the frame has changed (see LightControl.save_frame):
+#   b'BF', number of outputs, then per output [pin][bytes per pixel][length (2 bytes)][pixel-bytes in wire order]
+# Nothing else of Baldr is imported here, so main.py can show the frame first.
+# Also keeps the boot timeline: mark() the end of every stage, report() logs the ms per stage,
+# and the import profile: time and heap of every module import while profile_imports() is on.
+
+version = '1.2.0'
+
+import sys
+import gc
+import utime as time
+
+FILE    = '/params/frame.bin'
+MAGIC   = b'BF'
+
+# (stage, ticks_ms). ticks_ms counts from the reset
+timeline = []
+
+# True, if the strips show the saved frame
+shown = False
+
+# [module, depth, us, heap in bytes] per first import. The values of a module include the modules it imports
+imports = []
+_import = None
+_depth = 0
+
+def mark(stage):
+    timeline.append((stage, time.ticks_ms()))
+
+# Write the saved frame to the strips. Returns False, if there is no complete frame-file
+def show(file=None):
+    global shown
+    try:
+        f = open(file or FILE, 'rb')
+    except OSError:
+        return False
+    from machine import Pin
+    from neopixel import NeoPixel
+    strips = []
+    with f:
+        head = f.read(3)
+        if len(head) < 3 or head[:2] != MAGIC:
+            return False
+        for _ in range(head[2]):
+            output = f.read(4)
+            if len(output) < 4 or not output[1]:
+                return False
+            size = (output[2] << 8) | output[3]
+            np = NeoPixel(Pin(output[0], Pin.OUT), size // output[1], bpp=output[1])
+            if len(np.buf) != size or f.readinto(np.buf) != size:
+                return False
+            strips.append(np)
+    for np in strips:
+        np.write()
+    shown = True
+    mark('frame shown')
+    return True
+
+# Save the frame. outputs: list of (pin, bytes per pixel, pixel-bytes). Written to a temp-file and renamed, so a reset never leaves half a frame.
+# Returns False without a write, if the file already holds this frame: the compare is a read, every write erases a block of the flash
+def save(outputs, file=None):
+    import os
+    file = file or FILE
+    parts = [MAGIC + bytes((len(outputs),))]
+    for pin, bpp, data in outputs:
+        parts.append(bytes((pin, bpp, len(data) >> 8, len(data) & 0xFF)))
+        parts.append(data)
+    if _same(file, parts):
+        return False
+    tmp_file = file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        for part in parts:
+            f.write(part)
+    os.rename(tmp_file, file)
+    return True
+
+def _same(file, parts):
+    try:
+        f = open(file, 'rb')
+    except OSError:
+        return False
+    with f:
+        for part in parts:
+            if f.read(len(part)) != part:
+                return False
+        return not f.read(1)
+
+def remove(file=None):
+    import os
+    try:
+        os.remove(file or FILE)
+    except OSError:
+        pass
+
+# Heap in use. Only MicroPython has gc.mem_alloc()
+def heap():
+    try:
+        return gc.mem_alloc()
+    except AttributeError:
+        return 0
+
+def _profiled(name, *args):
+    global _depth
+    if name in sys.modules:
+        return _import(name, *args)
+    entry = [name, _depth, 0, 0]
+    imports.append(entry)
+    _depth += 1
+    used = heap()
+    start = time.ticks_us()
+    try:
+        return _import(name, *args)
+    finally:
+        entry[2] = time.ticks_diff(time.ticks_us(), start)
+        entry[3] = heap() - used
+        _depth -= 1
+
+# Profile the imports from now on (on=False: stop). Needs a port, where builtins.__import__ can be replaced
+def profile_imports(on=True):
+    global _import
+    import builtins
+    if on and _import is None:
+        _import = builtins.__import__
+        try:
+            builtins.__import__ = _profiled
+        except AttributeError:
+            _import = None
+    elif not on and _import is not None:
+        builtins.__import__ = _import
+        _import = None
+
+# Stages: ms since the reset at the end of every stage, and the ms of the stage. Imports: see 'imports'
+def get_info():
+    stages = []
+    last = 0
+    for stage, ticks in timeline:
+        stages.append([stage, ticks, time.ticks_diff(ticks, last)])
+        last = ticks
+    return {"stages": stages, "imports": imports}
+
+def report(event=None):
+    lines = ['Boot: %s after %d ms (%d ms)' % tuple(stage) for stage in get_info()["stages"]]
+    for name, depth, us, used in imports:
+        lines.append('Import: %s%s %d.%03d ms, %d bytes' % ('  ' * depth, name, us // 1000, us % 1000, used))
+    for line in lines:
+        if event:
+            event.log('I', line)
+        else:
+            print('[ INFO ] ' + line)
@@ -3,12 +3,14 @@
 
 # ! NOT TESTED YET - Do not release Baldr6.4 until this is done!
 
-version = "0.1.0"
+version = "0.1.1"
 config_target_version = "5.5"
 
 import ujson as json
 import os
-from logger import Log
+import logger
+
+event = logger.Create('OTA')
 
 class OTA_Diff_Migrator:
     def __init__(
@@ -29,22 +31,22 @@ class OTA_Diff_Migrator:
         if self.target_version is not None:
             if current_version == self.target_version:
                 return
-            Log('OTA', f'[ INFO  ]: Migration from {current_version} to {self.target_version}')
+            event.log('I', 'Migration from %s to %s', current_version, self.target_version)
 
         changed = self._apply_diff(config, self.schema_diff)
         if changed:
             config[self.version_key] = self.target_version if self.target_version is not None else current_version
             self._safe_write(config)
-            Log('OTA', '[ INFO  ]: JSON-File updated')
+            event.log('I', 'JSON-File updated')
         else:
-            Log('OTA', '[ INFO  ]:Migration not necessary, no new objects in json!')
+            event.log('I', 'Migration not necessary, no new objects in json!')
 
     def _load_config(self):
         try:
             with open(self.config_file) as f:
                 return json.load(f)
         except Exception as e:
-            Log('OTA', f'[ FAIL  ]: Config file not dound or corrupt!')
+            event.log('E', 'Config file not dound or corrupt!')
             return {}
 
     def _apply_diff(self, target, diff):
@@ -57,7 +59,7 @@ class OTA_Diff_Migrator:
                             if self._apply_diff(item, value):
                                 changed = True
                 else:
-                    Log('OTA', f'[ WARN  ]: Wildcard * only allowed for list objects!')
+                    event.log('W', 'Wildcard * only allowed for list objects!')
             elif isinstance(value, dict):
                 if key not in target or not isinstance(target[key], (dict, list)):
                     target[key] = {} if isinstance(value, dict) else value
@@ -82,16 +84,16 @@ class OTA_Diff_Migrator:
                 os.rename(self.config_file, backup_file)
             os.rename(tmp_file, self.config_file)
         except Exception as e:
-            Log('OTA', f'[ FAIL  ]: Error while writing config: {e}. Restoring backup...')
+            event.log('E', 'Error while writing config: %s. Restoring backup...', e)
             self.restore_backup()
 
     def restore_backup(self):
         backup_file = self.config_file + ".bak"
         if os.path.exists(backup_file):
             os.rename(backup_file, self.config_file)
-            Log('OTA', f'[ INFO  ]: Backup restored.')
+            event.log('I', 'Backup restored.')
         else:
-            Log('OTA', f'[ FAIL  ]: No Backup found.')
+            event.log('E', 'No Backup found.')
 
 # =====================================================================================================================
 # New JSON-Objects:
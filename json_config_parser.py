@@ -2,14 +2,72 @@
 # Currently 1 and 2 layers are supported, 2 means that the file is structured like >>>{"Example-Group": [{"example param": "example string"], "example-Group 2": [{"Example int-data": 2, ...<<<
 # To parse a json-file, create a config()-Object and get the data you want with the get()-function. (t.ex example=config(file='example.json', layers=2) ==> example.get('group', 'param'))
 # Use the save-param()-function to save or update data the same way as getting it with the get()-function (t.ex. example.save_param('group', 'param', 'new value'))
-version = '2.1'
+# For often changing 1-layer files (like status.json) use a journal()-Object: set() only appends the changes to <file>.log, debounced by tick()
+# Every file is parsed once (see load()). All config()-Objects of a file are views of the same data, a change by one of them is seen by all.
+# Several changes in one write: with example.batch(): example.save_param(...); example.save_param(...)
+version = '2.7'
 
 import json
 import sys
+import os
+import gc
+import utime as time
 
 # Add /params directory
 sys.path.insert(0, "./params")
 
+# Registry of the parsed files: file -> data. Filled by load()
+files = {}
+stats = {"parses": 0, "shared": 0, "parse_us": 0, "heap": 0, "writes": 0, "bytes": 0}
+
+# The data of a file, parsed with the first call
+def load(file):
+    conf = files.get(file)
+    if conf is not None:
+        stats["shared"] += 1
+        return conf
+    heap = _heap()
+    start = time.ticks_us()
+    with open(file) as f:
+        conf = json.load(f)
+    stats["parse_us"] += time.ticks_diff(time.ticks_us(), start)
+    stats["heap"] += _heap() - heap
+    stats["parses"] += 1
+    files[file] = conf
+    return conf
+
+# Parse the file again with the next load(), i.e. after it was written by another module
+def forget(file):
+    files.pop(file, None)
+
+def get_stats():
+    info = {"files": len(files)}
+    info.update(stats)
+    return info
+
+# Write the data to a temp-file and rename it over the file. A reset leaves the old or the new file, never a half written one
+def _replace(file, conf):
+    data = json.dumps(conf)
+    tmp_file = file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        f.write(data)
+    try:
+        os.rename(tmp_file, file)
+    except OSError:
+        # File systems, where rename does not replace an existing file
+        os.remove(file)
+        os.rename(tmp_file, file)
+    stats["writes"] += 1
+    stats["bytes"] += len(data)
+    return len(data)
+
+# Heap in use. Only MicroPython has gc.mem_alloc()
+def _heap():
+    try:
+        return gc.mem_alloc()
+    except AttributeError:
+        return 0
+
 class config(object):
     
     def __init__(
@@ -19,9 +77,12 @@ class config(object):
     ):
         self.file   = file
         self.layers = layers
+        self.conf   = load(self.file)
 
-        with open(self.file) as f:
-            self.conf = json.load(f)
+        # Open batches and changes, that wait for the end of the batch. Per open batch a copy of the data, to undo it
+        self._depth     = 0
+        self._pending   = False
+        self._snapshots = []
     
 # get data by the original name in the json-file   
     def get(
@@ -50,17 +111,234 @@ class config(object):
             section = self.conf[group]
             setting = section[0]
             setting[param] = new_value
+        self._save()
+
+# Collect the changes of a with-block and write them once at the end (t.ex. with example.batch(): ...). Batches can be nested.
+# If the block raises, its changes are undone (for all views of the file) and nothing is written. Costs a copy of the data per batch
+    def batch(self):
+        return self
+
+    def __enter__(self):
+        self._snapshots.append(self._snapshot())
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        snapshot = self._snapshots.pop()
+        if exc[0] is not None:
+            self._restore(snapshot)
+        if not self._depth and self._pending:
+            self._pending = False
+            if exc[0] is None:
+                self._write()
+        return False
+
+    def _snapshot(self):
+        return json.loads(json.dumps(self.conf))
 
-        with open(self.file, 'w') as file:
-            json.dump(self.conf, file)
+    # In place, the dict is shared with the other views of the file
+    def _restore(self, snapshot):
+        self.conf.clear()
+        self.conf.update(snapshot)
+
+    def _save(self):
+        if self._depth:
+            self._pending = True
+        else:
+            self._write()
+
+    def _write(self):
+        _replace(self.file, self.conf)
 
 # Save a python-lib to a json-file (or create a new file)
     def save_lib(self, lib, filename):
         with open(filename, 'w') as f:
             json.dump(lib, f)
+        forget(filename)
     
 def create(filename, content):
     newfile = open(filename, 'w')
     newfile.write(content)
     newfile.close()
+    forget(filename)
+
+
+# Status-file with an append-only journal. The changes are written as one line per flush into <file>.log:
+#   {"dim_status": 40, "color": [255, 0, 0, 0]}<TAB><checksum>
+# The file itself is only rewritten by compact(). On load, the lines of the journal are applied in order, up to the first torn line.
+# All journals are in 'journals', so flush_all() can write them before a machine.reset()
+journals = []
+
+class journal(config):
+
+    def __init__(
+            self,
+            file='status.json',
+            debounce=2000,
+            max_delay=30000,
+            compact=4096
+    ):
+
+        """
+        1-layer config-file, which saves the changes debounced in a journal.
+
+        Parameters:
+            file (str): Location of the json-file. The journal is file + '.log'.
+            debounce (int): Time in ms without a change, before the changes are written.
+            max_delay (int): Max. time in ms a change waits, while it is still changing.
+            compact (int): Size of the journal in bytes, from that on the json-file is rewritten and the journal removed.
+
+        Methods:
+        --------
+            get(): like config.get().
+            set(): changes a value in memory. It is written by tick() or flush().
+            save_param(): changes a value and writes it immediately. In a batch(), all changes of the batch are one record at its end.
+            tick(): writes the changes after the debounce-time. Call it in the main loop.
+            flush(): writes the changes now.
+            compact(): rewrites the json-file and removes the journal.
+            get_info(): statistics of the journal.
+        """
+
+        config.__init__(self, file, layers=1)
+        self.log_file   = self.file + '.log'
+        self.debounce   = debounce
+        self.max_delay  = max_delay
+        self.threshold  = compact
+        self.dirty      = {}
+        self.first      = 0
+        self.changed    = 0
+        self.size       = 0
+        self.records    = 0
+        self.writes     = 0
+        self.written    = 0
+        self.compactions = 0
+        self.torn       = 0
+
+        if self._replay():
+            self.compact()
+        journals.append(self)
+
+    # Apply the journal to the loaded file. Returns True, if a torn line was found
+    def _replay(self):
+        try:
+            f = open(self.log_file)
+        except OSError:
+            return False
+        with f:
+            for line in f:
+                self.size += len(line)
+                record = _check(line)
+                if record is None:
+                    self.torn += 1
+                    return True
+                self.conf.update(record)
+                self.records += 1
+        return False
+
+    def set(self, param, new_value):
+        if self.conf.get(param) == new_value:
+            return False
+        now = time.ticks_ms()
+        if not self.dirty:
+            self.first = now
+        self.changed = now
+        self.conf[param] = new_value
+        self.dirty[param] = new_value
+        return True
+
+    def save_param(
+            self,
+            group=None,
+            param=None,
+            new_value=None
+    ):
+        self.set(param, new_value)
+        self._save()
+
+    # Returns True, if the changes were written
+    def tick(self):
+        if self.dirty:
+            now = time.ticks_ms()
+            if time.ticks_diff(now, self.changed) >= self.debounce or time.ticks_diff(now, self.first) >= self.max_delay:
+                return self.flush()
+        return False
+
+    def flush(self):
+        if not self.dirty:
+            return False
+        data = json.dumps(self.dirty)
+        line = '%s\t%04x\n' % (data, _sum(data))
+        with open(self.log_file, 'a') as f:
+            f.write(line)
+        stats["writes"] += 1
+        stats["bytes"] += len(line)
+        self.dirty = {}
+        self.size += len(line)
+        self.records += 1
+        self.writes += 1
+        self.written += len(line)
+        if self.size > self.threshold:
+            self.compact()
+        return True
+
+    # In a batch: the changes of the batch are one record
+    def _write(self):
+        self.flush()
+
+    # The changes, that wait for the debounce, are undone with the data
+    def _snapshot(self):
+        return config._snapshot(self), dict(self.dirty)
+
+    def _restore(self, snapshot):
+        config._restore(self, snapshot[0])
+        self.dirty = snapshot[1]
+
+    # Write the whole file to a temp-file and rename it. The journal is only removed after the rename,
+    # so a reset in between leaves the old file or the new one with a journal, that changes nothing
+    def compact(self):
+        self.dirty = {}
+        self.written += _replace(self.file, self.conf)
+        try:
+            os.remove(self.log_file)
+        except OSError:
+            pass
+        self.writes += 1
+        self.size = 0
+        self.records = 0
+        self.compactions += 1
+
+    def get_info(self):
+        return {
+            "journal": self.size,
+            "records": self.records,
+            "pending": len(self.dirty),
+            "writes": self.writes,
+            "bytes": self.written,
+            "compactions": self.compactions,
+            "torn": self.torn
+        }
+
+def _sum(data):
+    return sum(data.encode()) & 0xFFFF
+
+# The record of a journal-line, or None if the line is torn
+def _check(line):
+    data, sep, checksum = line.rstrip('\n').rpartition('\t')
+    if not sep or not line.endswith('\n'):
+        return None
+    try:
+        if int(checksum, 16) != _sum(data):
+            return None
+        record = json.loads(data)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
 
+# Write the pending changes of all journals. Call it before a machine.reset()
+def flush_all():
+    for j in journals:
+        try:
+            j.flush()
+        except OSError:
+            pass
@@ -1,38 +1,575 @@
 # Logger for Issues in the Baldr-Software
+# Log-lines are collected in a RAM ring buffer and written to flash in batches.
+# A batch is flushed when 'flush_bytes' are pending, after 'flush_ms' or by calling flush() (i.e. before machine.reset()).
+# Every subsystem logs into a fixed number of segment-files (<sub>.<slot>.log). When the active segment is full, the oldest one is overwritten.
+# The size of all segments of all subsystems is limited by 'max_total', so the flash usage stays predictable.
+# Levels: 'D'=Debug, 'I'=Info, 'W'=Warning, 'E'=Error. Records below the threshold of a subsystem are dropped before any formatting.
+# Use Create(sub).log('I', 'text %s', value) to log with lazy formatting. Log() is kept for compatibility.
+# open_log() returns a LogReader, which reads the segments of a subsystem in fixed-size chunks (i.e. to publish them via MQTT).
 
-version = '1.3.2'
+version = '1.8.1'
 
 import NTP
 import os
+import utime as time
 
-ntp_time    = NTP.timestamp()
+# Segments of one subsystem. The slots are used as a ring, 'active' is the newest segment.
+class _Segments:
+    def __init__(self, name, count):
+        self.name   = name
+        self.seq    = [0] * count   # global sequence number of the segment, 0 = empty
+        self.size   = [0] * count
+        self.active = 0
+        self.used   = 0
 
-# Check size of the logfole. If it reaches 'max_size', delete the content
-def check_and_clear_log(log_file, max_size):
-    global version
-    
-    size = os.stat(log_file)[6] 
-    if size > max_size:
-        with open(log_file, 'w') as f:
-            f.write('***   LOGGER V '+ str(version)+' | File='+str(log_file)+'   ***')
+    def oldest(self):
+        return (self.active - self.used + 1) % len(self.seq)
+
+    # Slots from the oldest to the newest segment
+    def order(self):
+        n = len(self.seq)
+        start = self.oldest()
+        return [(start + i) % n for i in range(self.used)]
+
+class LogSink:
+    def __init__(
+            self,
+            dir='/log/',
+            capacity=2048,
+            flush_bytes=1024,
+            flush_ms=5000,
+            segments=4,
+            segment_size=1024,
+            max_total=16384
+            ):
+        
+        """
+        Parameters:
+            dir (str): Directory of the logfiles.
+            capacity (int): Size of the ring buffer in bytes.
+            flush_bytes (int): Pending bytes that trigger a flush.
+            flush_ms (int): Max. time in ms a record stays in the buffer. Checked by tick().
+            segments (int): Number of segment-files per subsystem.
+            segment_size (int): Size of a segment in bytes. A new segment is started when it is reached.
+            max_total (int): Max. bytes of all segments in 'dir'. The oldest segments are deleted above this limit.
+        
+        A record is stored as [sub-index (1 byte)][length (2 bytes)][line].
+        """
+
+        self.dir            = dir
+        self.capacity       = capacity
+        self.flush_bytes    = flush_bytes
+        self.flush_ms       = flush_ms
+        self.segments       = segments
+        self.segment_size   = segment_size
+        self.max_total      = max_total
+
+        self.buf    = bytearray(capacity)
+        self.mv     = memoryview(self.buf)
+        self.head   = 0     # write position
+        self.tail   = 0     # read position
+        self.used   = 0
+        self.pending = 0    # records in the buffer
+
+        self.subs   = []    # sub-index -> subsystem name
+        self.mask   = 0     # bit per sub-index with pending records
+
+        self.streams    = {}    # subsystem name -> _Segments
+        self.total      = 0     # bytes in all segments
+        self.seq        = 0     # last used segment sequence number
+        self._load()
+
+        self.flushed    = 0
+        self.dropped    = 0
+        self.last_flush = time.ticks_ms()
+
+    def write(self, sub, line):
+        data = line.encode()
+        n = min(len(data), self.capacity - 3, 0xFFFF)
+        if n + 3 > self.capacity - self.used:
+            self.flush()
+            if n + 3 > self.capacity - self.used:
+                self.dropped += 1
+                return False
+
+        if sub in self.subs:
+            idx = self.subs.index(sub)
+        else:
+            if len(self.subs) > 255:
+                self.dropped += 1
+                return False
+            idx = len(self.subs)
+            self.subs.append(sub)
+
+        self._put_byte(idx)
+        self._put_byte(n >> 8)
+        self._put_byte(n & 0xFF)
+        src = memoryview(data)
+        first = min(n, self.capacity - self.head)
+        self.mv[self.head:self.head + first] = src[:first]
+        if first < n:
+            self.mv[0:n - first] = src[first:n]
+        self.head = (self.head + n) % self.capacity
+        self.used += n
+        self.pending += 1
+        self.mask |= 1 << idx
+
+        if self.used >= self.flush_bytes:
+            self.flush()
+        return True
+
+    def _put_byte(self, value):
+        self.buf[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.used += 1
+
+    def tick(self):
+        if self.pending and time.ticks_diff(time.ticks_ms(), self.last_flush) >= self.flush_ms:
+            self.flush()
+
+    # Write all pending records. Every logfile is opened once per flush.
+    def flush(self):
+        self.last_flush = time.ticks_ms()
+        if not self.pending:
+            return 0
+        written = 0
+        for idx in range(len(self.subs)):
+            if self.mask & (1 << idx):
+                try:
+                    written += self._write_sub(idx)
+                except OSError:
+                    # Records of this subsystem are lost, the others are still written
+                    pass
+        self.dropped += self.pending - written
+        self.flushed += written
+        self.head = self.tail = self.used = self.pending = self.mask = 0
+        return written
+
+    def _write_sub(self, idx):
+        sub = self.subs[idx]
+        seg = self._segments(sub)
+        written = 0
+        file = None
+        try:
+            pos = self.tail
+            left = self.pending
+            while left:
+                rec = self.buf[pos]
+                n = (self.buf[(pos + 1) % self.capacity] << 8) | self.buf[(pos + 2) % self.capacity]
+                start = (pos + 3) % self.capacity
+                if rec == idx:
+                    if not seg.used or seg.size[seg.active] + n > self.segment_size:
+                        if file:
+                            file.close()
+                            file = None
+                        self._rotate(sub, seg)
+                    if file is None:
+                        file = open(self._file(sub, seg.active), 'ab')
+                    first = min(n, self.capacity - start)
+                    file.write(self.mv[start:start + first])
+                    if first < n:
+                        file.write(self.mv[0:n - first])
+                    seg.size[seg.active] += n
+                    self.total += n
+                    written += 1
+                pos = (start + n) % self.capacity
+                left -= 1
+        finally:
+            if file:
+                file.close()
+        self._evict()
+        return written
+
+    def _file(self, sub, slot):
+        return self.dir + sub + '.' + str(slot) + '.log'
+
+    def _segments(self, sub):
+        seg = self.streams.get(sub)
+        if seg is None:
+            seg = _Segments(sub, self.segments)
+            self.streams[sub] = seg
+        return seg
+
+    # Start a new segment. If all slots are used, the oldest segment is overwritten
+    def _rotate(self, sub, seg):
+        if seg.used:
+            seg.active = (seg.active + 1) % self.segments
+        if seg.used == self.segments:
+            self.total -= seg.size[seg.active]
+        else:
+            seg.used += 1
+        self.seq += 1
+        sub_file = self._file(sub, seg.active)
+        header = '***   LOGGER V '+ str(version)+' | File='+str(sub_file)+' | Segment='+str(self.seq)+'   ***\n'
+        with open(sub_file, 'w') as f:
+            f.write(header)
+        seg.seq[seg.active] = self.seq
+        seg.size[seg.active] = len(header)
+        self.total += len(header)
+
+    # Delete the oldest segments of all subsystems until 'max_total' is kept. Active segments are not deleted.
+    def _evict(self):
+        while self.total > self.max_total:
+            victim = None
+            for seg in self.streams.values():
+                if seg.used > 1 and (victim is None or seg.seq[seg.oldest()] < victim.seq[victim.oldest()]):
+                    victim = seg
+            if victim is None:
+                return
+            slot = victim.oldest()
+            try:
+                os.remove(self._file(victim.name, slot))
+            except OSError:
+                pass
+            self.total -= victim.size[slot]
+            victim.seq[slot] = 0
+            victim.size[slot] = 0
+            victim.used -= 1
+
+    # Read the existing segments once at startup. Logfiles of the old format (<sub>.log) are adopted as the oldest segment of their subsystem
+    def _load(self):
+        try:
+            files = os.listdir(self.dir.rstrip('/'))
+        except OSError:
+            return
+        legacy = []
+        for name in files:
+            if not name.endswith('.log'):
+                continue
+            dot = name.rfind('.', 0, -4)
+            slot = name[dot + 1:-4]
+            if dot < 1 or not slot.isdigit():
+                legacy.append(name)
+                continue
+            if int(slot) >= self.segments:
+                try:
+                    os.remove(self.dir + name)
+                except OSError:
+                    pass
+                continue
+            sub = name[:dot]
+            slot = int(slot)
+            try:
+                size = os.stat(self.dir + name)[6]
+                with open(self.dir + name) as f:
+                    header = f.readline()
+                seq = int(header[header.index('Segment=') + 8:].split()[0])
+            except (OSError, ValueError):
+                continue
+            seg = self._segments(sub)
+            seg.seq[slot] = seq
+            seg.size[slot] = size
+            self.total += size
+            self.seq = max(self.seq, seq)
+
+        for name in legacy:
+            self._adopt(name)
+
+        for seg in self.streams.values():
+            seg.used = 0
+            for slot in range(self.segments):
+                if seg.seq[slot]:
+                    seg.used += 1
+                    if seg.seq[slot] > seg.seq[seg.active]:
+                        seg.active = slot
+
+    # Logfile of the old format as segment with seq 1 (older than every new segment), in slot 0 if it is free.
+    # Copied behind a segment-header, so the next _load() reads it like the others. Deleted, if the subsystem has no free slot
+    def _adopt(self, name):
+        sub = name[:-4]
+        seg = self._segments(sub)
+        slot = 0
+        while slot < self.segments and seg.seq[slot]:
+            slot += 1
+        try:
+            if slot < self.segments:
+                sub_file = self._file(sub, slot)
+                header = '***   LOGGER V '+ str(version)+' | File='+str(sub_file)+' | Segment=1   ***\n'
+                with open(self.dir + name, 'rb') as old, open(sub_file, 'wb') as f:
+                    f.write(header.encode())
+                    chunk = old.read(256)
+                    while chunk:
+                        f.write(chunk)
+                        chunk = old.read(256)
+                size = os.stat(sub_file)[6]
+                seg.seq[slot] = 1
+                seg.size[slot] = size
+                self.total += size
+                self.seq = max(self.seq, 1)
+            os.remove(self.dir + name)
+        except OSError:
+            pass
+
+    # Segment-files of a subsystem from the oldest to the newest
+    def files(self, sub):
+        seg = self.streams.get(sub)
+        if seg is None:
+            return []
+        return [self._file(sub, slot) for slot in seg.order()]
+
+    def get_stats(self):
+        return {"pending": self.pending, "flushed": self.flushed, "dropped": self.dropped, "total_bytes": self.total}
+
+# One sink per log-directory
+sinks = {}
+
+def get_sink(dir='/log/', max_size=4096):
+    if not dir.endswith('/'):
+        dir += '/'
+    sink = sinks.get(dir)
+    if sink is None:
+        sink = LogSink(dir=dir, segment_size=max_size // 4)
+        sinks[dir] = sink
+    return sink
+
+# Severity levels and their tag in the logfile
+LEVELS  = {'D': 0, 'I': 1, 'W': 2, 'E': 3}
+TAGS    = {'D': '[ DEBUG ]', 'I': '[ INFO  ]', 'W': '[ WARN  ]', 'E': '[ ERROR ]'}
+
+# Threshold per subsystem. Subsystems without an own threshold use 'default_level'
+default_level   = LEVELS['I']
+thresholds      = {}
+
+# Level-name (i.e. 'W' or 'WARN') -> level-key
+def parse_level(level):
+    key = str(level)[:1].upper()
+    if key not in LEVELS:
+        raise ValueError('Unknown log level: ' + str(level))
+    return key
+
+# Change the threshold of a subsystem at runtime. sub='all' changes the default for all subsystems
+def set_level(sub, level):
+    global default_level
+    value = LEVELS[parse_level(level)]
+    if sub == 'all':
+        default_level = value
+        thresholds.clear()
+    else:
+        thresholds[sub] = value
+
+def get_level(sub):
+    value = thresholds.get(sub, default_level)
+    for key in LEVELS:
+        if LEVELS[key] == value:
+            return key
+
+def enabled(sub, level):
+    return LEVELS[level] >= thresholds.get(sub, default_level)
+
+class Create:
+    def __init__(
+            self,
+            sub='Pico',
+            dir='/log/',
+            max_size=4096
+            ):
         
+        """
+        Logger for one subsystem.
+
+        Parameters:
+            sub (str): Name of the subsystem. Used as name of the logfile.
+            dir (str): Directory of the logfiles.
+            max_size (int): Max. size per subsystem. Only used if the sink for 'dir' is created by this logger.
+
+        Methods:
+        --------
+            log(level, msg, *args): logs msg % args. The message is only formatted if the level is enabled.
+            enabled(level): True, if records of this level are written.
+        """
+
+        self.sub    = sub
+        self.dir    = dir
+        self.max_size = max_size
+        # The sink (ring buffer and directory scan) is created with the first record, not at the import of a module
+        self.sink   = None
+
+    def log(self, level, msg, *args):
+        if LEVELS[level] < thresholds.get(self.sub, default_level):
+            return
+        if args:
+            msg = msg % args
+        if self.sink is None:
+            self.sink = get_sink(self.dir, self.max_size)
+        self.sink.write(self.sub, NTP.timestamp() + ' >>> ' + TAGS[level] + ': ' + str(msg) + '\n')
+
+    def enabled(self, level):
+        return enabled(self.sub, level)
+
+# Logger without output, i.e. if logging is disabled
+class DummyLogger:
+    def log(self, level, msg, *args):
+        pass
+
+    def enabled(self, level):
+        return False
+
+# Level of a message in the old format (i.e. '[ WARN  ]: ...')
+def _level_of(issue):
+    if isinstance(issue, str) and issue[:1] == '[':
+        tag = issue[2:3]
+        if tag in LEVELS:
+            return tag
+        if tag == 'F':
+            return 'E'
+    return 'I'
+
 # Log-function. can be imported and used in all other programs
 def Log(
         sub='Pico', 
         issue=None,
         dir='/log/',
-        max_size=4096
+        max_size=4096,
+        level=None
         ):
     
-    sub_file = dir + sub + '.log'
+    if level is None:
+        level = _level_of(issue)
+    if LEVELS[level] < thresholds.get(sub, default_level):
+        return
     time = NTP.timestamp()
-    with open(sub_file, 'a') as file:
-        file.write(str(time) + ' >>> ' + str(issue) + '\n')
-    
-    # Check and / or clear logfile
-    check_and_clear_log(log_file=sub_file, max_size=max_size)
+    get_sink(dir, max_size).write(sub, str(time) + ' >>> ' + str(issue) + '\n')
+# Call in the main loop to flush the buffered records after 'flush_ms'
+def tick():
+    for sink in sinks.values():
+        sink.tick()
+
+# Write all buffered records. Must be called before machine.reset()
+def flush():
+    for sink in sinks.values():
+        sink.flush()
 
-# return logfile content 
-def get_log(sub, dir='/log'):
-    sub_file = dir + sub + '.log'
-    return sub_file
+def get_stats():
+    stats = {"pending": 0, "flushed": 0, "dropped": 0, "total_bytes": 0}
+    for sink in sinks.values():
+        for key, value in sink.get_stats().items():
+            stats[key] += value
+    return stats
+
+# return the logfiles of a subsystem, oldest first
+def get_log(sub, dir='/log/'):
+    sink = get_sink(dir)
+    sink.flush()
+    return sink.files(sub)
+
+class LogReader:
+    def __init__(
+            self,
+            files,
+            chunk=512,
+            offset=0,
+            tail=None,
+            since=None
+            ):
+        
+        """
+        Reads logfiles in chunks. Only one chunk is held in RAM, every call of next() reads at most one chunk.
+
+        Parameters:
+            files (list): Logfiles, oldest first. They are read as one continuous log.
+            chunk (int): Size of a chunk in bytes.
+            offset (int): Start position in bytes.
+            tail (int): Only read the last 'tail' bytes.
+            since (str): Skip all lines with an older timestamp (i.e. '2026-01-31|12:00'). The prefix of the timestamp is compared.
+        """
+
+        self.files  = files
+        self.sizes  = []
+        for file in files:
+            try:
+                self.sizes.append(os.stat(file)[6])
+            except OSError:
+                self.sizes.append(0)
+        self.total  = sum(self.sizes)
+
+        start = offset
+        if tail is not None:
+            start = max(start, self.total - tail)
+        self.pos    = start     # position in the whole log
+        self.index  = 0         # actual file
+        self.local  = start     # position in the actual file
+        while self.index < len(self.sizes) and self.local >= self.sizes[self.index]:
+            self.local -= self.sizes[self.index]
+            self.index += 1
+
+        self.buf    = bytearray(chunk)
+        self.mv     = memoryview(self.buf)
+        self.since  = since.encode() if since else None
+        self.midline = False
+        self.file   = None
+        self.seq    = 0
+        self.done   = self.index >= len(self.files)
+
+    # Returns the next chunk as memoryview. The chunk is empty while 'since' is searched or at a file change.
+    def next(self):
+        if self.done:
+            return self.mv[:0]
+        if self.file is None:
+            self.file = open(self.files[self.index], 'rb')
+            self.file.seek(self.local)
+
+        n = self.file.readinto(self.mv) or 0
+        if n == 0:
+            self._next_file()
+            return self.mv[:0]
+
+        if self.since is not None:
+            self._search(n)
+            return self.mv[:0]
+
+        self.local += n
+        self.pos += n
+        self.seq += 1
+        if n < len(self.buf):
+            self._next_file()
+        return self.mv[:n]
+
+    # Look for the first line in the chunk with a timestamp >= since
+    def _search(self, n):
+        data = bytes(self.mv[:n])
+        start = 0
+        if self.midline:
+            # Rest of a line that was longer than a chunk
+            start = data.find(b'\n') + 1
+            self.midline = start == 0
+            if self.midline:
+                start = n
+        while start < n:
+            if data[start:start + 1] != b'*' and data[start:start + len(self.since)] >= self.since:
+                self.since = None
+                break
+            nl = data.find(b'\n', start)
+            if nl < 0:
+                break
+            start = nl + 1
+        if self.since is not None and start == 0:
+            start = n
+            self.midline = True
+        if self.since is None or start < n or n == len(self.buf):
+            self.local += start
+            self.pos += start
+            self.file.seek(self.local)
+        else:
+            self._next_file()
+
+    def _next_file(self):
+        self.close()
+        self.index += 1
+        self.local = 0
+        self.done = self.index >= len(self.files)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+# Open the logfiles of a subsystem for reading in chunks
+def open_log(
+        sub,
+        chunk=512,
+        offset=0,
+        tail=None,
+        since=None,
+        dir='/log/'
+        ):
+    return LogReader(get_log(sub, dir), chunk=chunk, offset=offset, tail=tail, since=since)
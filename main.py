@@ -1,17 +1,38 @@
 # Simple script to start the Device
-version = '6.4.0'
+# Importing a module only defines it. The work is done in the stages below, in this order, each one marked in the boot timeline
+version = '6.7.0'
 
-import PicoWifi as wlan
-import PicoClient as MQTT
-import LightControl
+# Light first: the last frame from the raw file, before anything else is loaded. Only with autostart (the parse of config.json is shared with LightControl)
+import boot_frame
+import json_config_parser
+if json_config_parser.config('/params/config.json').get('LightControl_settings', 'autostart'):
+    boot_frame.show()
+boot_frame.profile_imports()
 
-# start Light-Control
+# start Light-Control (autostart with the saved color and level)
+import LightControl
+LC = LightControl.LC
+boot_frame.mark('light control')
 print('[ INFO ] Welcome to BALDR Version', version)
 
 # Connect to WLAN using PicoWifi-Module
+import PicoWifi as wlan
 wlan.connect()
+boot_frame.mark('wifi')
 print('[ INFO ] PicoWifi is connected!')
 
-# Establish MQTT-Connection 
+# Set the RTC once. After this, the time is kept by the ClockService in the PicoClient-Loop
+import NTP
+NTP.clock.sync()
+boot_frame.mark('ntp')
+
+# Establish MQTT-Connection
+import PicoClient as MQTT
+MQTT.init()
+boot_frame.mark('client')
+boot_frame.profile_imports(False)
+boot_frame.report(LC.event0)
+import json_config_parser
+LC.event0.log('I', 'Config: %s', json_config_parser.get_stats())
 print('[ INFO ] PicoClient is running!')
 MQTT.go()
\ No newline at end of file
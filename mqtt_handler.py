@@ -1,9 +1,9 @@
 # New MQTT-Handler Module for Baldr V6.x
 
-version = '1.4.1'
+version = '1.8.0'
 
 from umqtt_simple import MQTTClient
-from logger import Log
+import logger
 import utime as time
 import json
 
@@ -13,6 +13,9 @@ try:
 except ImportError:
     Optional = Any = object
 
+event = logger.Create('MQTT')
+ota_event = logger.Create('OTA')
+
 class MQTTHandler:
     def __init__(
             self, 
@@ -29,8 +32,10 @@ class MQTTHandler:
         self.password = password
         self.client: Optional[MQTTClient] = None # type: ignore
         self.subscribed_topic = None
+        self.handlers = {}      # topic -> function for binary messages, i.e. frames
         self.injson = pinjson
         self.received = False
+        self.streams = []
 
     # Establish MQTT-Connection
     def connect(self):
@@ -39,10 +44,10 @@ class MQTTHandler:
             self.client.set_callback(self.on_message)
             self.client.set_last_will(topic=f"{self.client_id}/status", msg='offline', retain=True)
             self.client.connect()
-            Log('MQTT', '[ INFO  ]: MQTT connection established!')
+            event.log('I', 'MQTT connection established!')
             return True
         except Exception as e:
-            Log('MQTT', f'[ FAIL  ]: Connection failed - {e}')
+            event.log('E', 'Connection failed - %s', e)
             return False
 
     # process incomming messages
@@ -53,7 +58,15 @@ class MQTTHandler:
             ):
         if not msg:
             pass
+        ans = None
         try:
+            handler = self.handlers.get(topic.decode() if isinstance(topic, bytes) else topic)
+            if handler:
+                ans = handler(msg)
+                if ans:
+                    self.publish(f"{self.client_id}/status", ans)
+                return
+
             in_message = msg.decode('utf-8')
             self.set_rec(True)
             import ujson as json
@@ -77,15 +90,22 @@ class MQTTHandler:
                 ans = '>> No order processing <<'
 
         except Exception as e:
-            Log('MQTT', f'[ FAIL  ]: Message processing failed - {e}')
-            Log('MQTT', f'[ INFO  ]: Message: {msg} | Order result: {ans}')
+            event.log('E', 'Message processing failed - %s', e)
+            event.log('I', 'Message: %s | Order result: %s', msg, ans)
+
+    # Subscribe to a topic with a binary handler. The raw message is passed to the handler, its answer is published, if there is one
+    def subscribe_binary(self, topic, handler):
+        self.handlers[topic] = handler
+        if self.client:
+            self.client.subscribe(topic)
+            event.log('I', 'Subscribed to %s', topic)
 
     # Subscribe to the topic
     def subscribe(self, topic):
         self.subscribed_topic = topic
         if self.client:
             self.client.subscribe(topic)
-            Log('MQTT', f'[ INFO  ]: Subscribed to {topic}')
+            event.log('I', 'Subscribed to %s', topic)
             self.publish(f"{self.client_id}/status", {"msg": "online", "is_err_msg": False, "origin": "mqtt_handler"})
 
     # Publish-function
@@ -108,13 +128,35 @@ class MQTTHandler:
             self.client.publish(topic, str(message.get("msg")), retain=retain)
             # Log('MQTT', f'[ INFO  ]: Published message to {topic}: {message}')
 
+    # Publish a LogReader chunk by chunk. Each message is '<seq>|<offset>|<last>\n' followed by the raw log-data
+    def stream(self, topic, reader):
+        self.streams.append((topic, reader))
+
+    # Call in the main loop. Publishes one chunk of the oldest stream per call
+    def service(self):
+        if not self.streams or not self.client:
+            return
+        topic, reader = self.streams[0]
+        try:
+            offset = reader.pos
+            data = reader.next()
+            if len(data) or reader.done:
+                header = '%d|%d|%d\n' % (reader.seq, offset, 1 if reader.done else 0)
+                self.client.publish(topic, header.encode() + data)
+        except Exception as e:
+            event.log('E', 'Log-stream to %s failed - %s', topic, e)
+            reader.done = True
+        if reader.done:
+            reader.close()
+            self.streams.pop(0)
+
     # Check for incoming messages, reconnect if needed
     def check_msg(self):
         try:
             if self.client:
                 self.client.check_msg()
         except Exception as e:
-            Log('MQTT', f'[ ERROR ]: MQTT error - {e}')
+            event.log('E', 'MQTT error - %s', e)
             self.reconnect()
     def wait_msg(self):
         if self.client is not None:
@@ -123,16 +165,18 @@ class MQTTHandler:
     def disconnect(self):
         if self.client:
             self.client.disconnect()
-            Log('MQTT', '[ INFO  ]: MQTT connection closed')
+            event.log('I', 'MQTT connection closed')
     
     def reconnect(self):
-        Log('MQTT', '[ INFO  ]: Attempting to reconnect...')
+        event.log('I', 'Attempting to reconnect...')
         self.disconnect() 
         while not self.connect(): 
-            Log('MQTT', '[ INFO  ]: Reconnect failed, retrying in 5 seconds...')
+            event.log('I', 'Reconnect failed, retrying in 5 seconds...')
             time.sleep(5) 
-        Log('MQTT', '[ INFO  ]: Reconnected successfully!')
+        event.log('I', 'Reconnected successfully!')
         self.subscribe(self.subscribed_topic)
+        for topic in self.handlers:
+            self.client.subscribe(topic)
     
     def set_rec(self, state):
         self.received=state
@@ -160,25 +204,28 @@ class MQTTHandler:
                 'order.py',
                 'logger.py',
                 'Led_controller.py',
-                'json_config_parder.py',
+                'json_config_parser.py',
                 'NTP.py',
+                'udp_stream.py',
+                'render_core.py',
+                'boot_frame.py',
                 'versions.py'
                 ]
 
         def update_single_module(name, url):
             try:
-                Log('OTA', f'[ INFO  ]: Downloading {name} from {url}')
+                ota_event.log('I', 'Downloading %s from %s', name, url)
                 response = requests.get(url)
                 if response.status_code == 200:
                     with open(name, "w") as f:
                         f.write(response.text)
-                    Log('OTA', f'[ INFO  ]: {name} updated successfully')
+                    ota_event.log('I', '%s updated successfully', name)
                     self.publish(f"{self.client_id}/status", {"msg": f'{name} update was successful!', "is_err_msg": False, "origin": "OTA_Update"})
                 else:
-                    Log('OTA', f'[ FAIL  ]: Could not download {name}')
+                    ota_event.log('E', 'Could not download %s', name)
                     self.publish(f"{self.client_id}/status", {"msg": f'update failed for {name}', "is_err_msg": True, "origin": "OTA_Update"})
             except Exception as e:
-                Log('OTA', f'[ FAIL  ]: Update failed for {name} - {e}')
+                ota_event.log('E', 'Update failed for %s - %s', name, e)
                 self.publish(f"{self.client_id}/status", {"msg": f'update error for {name}: {e}', "is_err_msg": True, "origin": "OTA_Update"})
 
         if isinstance(module_name, list):
@@ -187,8 +234,11 @@ class MQTTHandler:
                 update_single_module(mod, url)
             
             self.publish(f"{self.client_id}/status", {"msg": "OTA-Update done! Will now reboot...", "is_err_msg": False, "origin": "OTA_Update"})       
-            Log('OTA', '[ INFO  ]: Update done. Will now reboot ...')
+            ota_event.log('I', 'Update done. Will now reboot ...')
             import machine
+            import json_config_parser
+            json_config_parser.flush_all()
+            logger.flush()
             machine.reset()
         
         else:
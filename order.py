@@ -1,12 +1,25 @@
 # Smarthome Order-Modul by vwall
 
-version = '6.4.2'
+version = '6.19.0'
 
 import json
-from LightControl import LC as LightControl
-from logger import Log, get_log
+from binascii import a2b_base64
+import LightControl as light      # light.LC is created on first use, see LightControl.py
+from LightControl import POLICIES, EASING, EFFECTS
+import logger
 from hex_to_rgb import hex_to_rgb
 
+event = logger.Create('Order')
+mqtt_event = logger.Create('MQTT')
+ntp_event = logger.Create('NTP')
+
+# Policy per LightControl-command, if the order has no 'policy' (replace, queue or blend)
+LC_POLICY = {'dim': 'replace', 'line': 'queue', 'smooth': 'replace', 'effect': 'replace'}
+
+# Binary frames (topic <client>/frame): 4 header-bytes [flags][output-index][start-pixel high][start-pixel low], followed by the pixel-bytes
+FRAME_HEADER = 4
+FRAME_RLE = 0x01
+
 class Proc:
     def __init__(self, data=None):
         if data is None:
@@ -26,6 +39,9 @@ class Proc:
         command = self.data['command']
         payload = self.data['payload']
 
+        if command == 'frame':
+            return self.frame(payload)
+
         if 'dir' in self.data:
             dir = self.data['dir']
         else:
@@ -33,11 +49,29 @@ class Proc:
         
         if isinstance(payload, list):
             color = payload
-        if isinstance(payload, str):
+        if isinstance(payload, str) and command != 'effect':
             try:
                 color = hex_to_rgb(str(payload))
             except ValueError:
                 return self.make_result('Failed! Payload is not list or hex!', is_error=True, origin='LightControl')
+
+        # Dim: the level is checked here, on the render core an error of set_dim() would not reach the answer
+        if command == 'dim':
+            try:
+                payload = int(payload)
+            except (TypeError, ValueError):
+                return self.make_result('Failed! Level is not a number!', is_error=True, origin='LightControl')
+            if not 0 <= payload <= 100:
+                return self.make_result(msg=f'Level out of range (0-100): {payload}', is_error=True, origin='LightControl')
+
+        # Effect: the payload is the name, the colors are in the palette (list or hex)
+        if command == 'effect':
+            if payload not in EFFECTS:
+                return self.make_result(msg=f'Unknown effect: {payload}', is_error=True, origin='LightControl')
+            try:
+                palette = [c if isinstance(c, list) else hex_to_rgb(str(c)) for c in self.data.get('palette', [])]
+            except ValueError:
+                return self.make_result('Failed! Palette is not list or hex!', is_error=True, origin='LightControl')
         
         if 'speed' in self.data:
             speed   = self.data['speed']
@@ -49,19 +83,50 @@ class Proc:
         else:
             steps = 50
 
+        policy = self.data.get('policy', LC_POLICY.get(command, 'replace'))
+        if policy not in POLICIES:
+            return self.make_result(msg=f'Unknown policy: {policy}', is_error=True, origin='LightControl')
+
+        easing = self.data.get('easing', 'linear')
+        if easing not in EASING:
+            return self.make_result(msg=f'Unknown easing: {easing}', is_error=True, origin='LightControl')
+
+        # Name or list of names of the segments and id of the output. Without them, all outputs are changed
+        segment = self.data.get('segment')
+        output = self.data.get('output')
+        try:
+            light.LC.get_segments(segment, output)
+        except ValueError as e:
+            return self.make_result(msg=str(e), is_error=True, origin='LightControl')
+
         command_map = {
-            'dim': lambda: LightControl.set_dim(payload, speed),
-            'line': lambda: LightControl.line(color, speed, dir),
-            'smooth': lambda: LightControl.set_smooth(color, speed, steps) 
+            'dim': lambda: light.LC.submit('set_dim', payload, speed, policy=policy, segment=segment, output=output),
+            'line': lambda: light.LC.submit('line', color, speed, dir, policy=policy, segment=segment, output=output),
+            'smooth': lambda: light.LC.submit('set_smooth', color, speed, steps, policy=policy, segment=segment, output=output, easing=easing),
+            'effect': lambda: light.LC.submit('effect', payload, speed, palette, self.data.get('duration', 0), policy=policy, segment=segment, output=output)
         }
         
         if command in command_map:
             command_map[command]()
             return self.make_result(msg=True, is_error=False, origin='LightControl')
         else:
-            Log('Order', f'[ INFO  ]: Command not found. Command = {command}')
+            event.log('I', 'Command not found. Command = %s', command)
             return self.make_result(msg='Command not found!', is_error=True, origin='LightControl')
 
+    # Pixel-bytes as base64-string in wire order of the strip (GRB/GRBW). 'rle': runs of [count][pixel-bytes], 'start': first pixel, 'output': id of the output
+    def frame(self, payload):
+        try:
+            # binascii.Error is a ValueError. Invalid characters can also decode to nothing or to a part of a pixel, see frame_count()
+            data = a2b_base64(payload)
+            args = (data, int(self.data.get('start', 0)), self.data.get('output'), bool(self.data.get('rle', False)))
+            # The number of pixels is answered in both modes. On the render core, the frame is only queued here
+            count = light.LC.frame_count(*args)
+            if light.LC.submit('frame', *args) is False:
+                return self.make_result(msg='Frame dropped: render queue full', is_error=True, origin='LightControl')
+        except ValueError as e:
+            return self.make_result(msg=f'Frame rejected: {e}', is_error=True, origin='LightControl')
+        return self.make_result(msg=count, is_error=False, origin='LightControl')
+
     # Admin-Functions
     def admin(self):
 
@@ -76,16 +141,17 @@ class Proc:
             'alive': lambda: 'ok',
             'get_version': lambda: self.get_version(),
             'change_led_qty': lambda: self.change_led_qty(new_value),
-            'get_qty': lambda: LightControl.pixel,
+            'get_qty': lambda: light.LC.pixel,
             'set_autostart': lambda: self.change_autostart_setting(new_value),
             'get_log': lambda: self.get_log(),
-            'set_GMT_wintertime': lambda: self.change_GMT_time(new_value),
-            'set_GMT_offset': lambda: self.change_GMT_time(new_value),
+            'set_GMT_wintertime': lambda: self.change_GMT_time(winter=new_value),
+            'set_GMT_offset': lambda: self.change_GMT_time(GMT_adjust=new_value),
             'get_timestamp': lambda: self.get_timestamp(),
             'reboot': lambda: self.reboot(),
             'get_sysinfo': lambda: self.get_sysinfo(),
             'onboard_led_active': lambda: self.onboard_led_active(new_value),
-            'publish_in_json': lambda: self.pinjson(new_value)
+            'publish_in_json': lambda: self.pinjson(new_value),
+            'set_log_level': lambda: self.set_log_level(new_value)
         }
         
         return command_map.get(command, lambda: self.make_result(msg=f'Command not found: {command}', is_error=True, origin="command_handler"))()
@@ -102,18 +168,35 @@ class Proc:
 
     # Log when Broker is offfline
     def handle_offline(self):
-        Log('MQTT', '[ INFO  ]: Broker is offline under normal conditions')
+        mqtt_event.log('I', 'Broker is offline under normal conditions')
         return 'conn_lost'
 
     def get_sysinfo(self):
         import sys
-        platform = sys.platform
-        return self.make_result(msg=f'Platform: {platform}', is_error=False, origin='admin')
+        from NTP import clock
+        from PicoClient import stream, core
+        info = {"platform": sys.platform, "ntp": clock.get_info(), "log": logger.get_stats()}
+        # strip, power, animations and render: on the render core, if it runs
+        try:
+            info.update(light.LC.query('get_render_info'))
+        except OSError as e:
+            info["render_error"] = str(e)
+        if stream:
+            info["stream"] = stream.get_info()
+        if core:
+            info["render_core"] = core.get_info()
+        import boot_frame
+        import json_config_parser
+        info["boot"] = boot_frame.get_info()
+        info["config"] = json_config_parser.get_stats()
+        return self.make_result(msg=info, is_error=False, origin='admin')
 
     # Reboot-request
     def reboot(self):
-        Log('Order', '[ INFO  ]: Reboot requested. Will now call a machine.reset()')
+        event.log('I', 'Reboot requested. Will now call a machine.reset()')
         import machine
+        light.LC.check_save(force=True)
+        logger.flush()
         machine.reset()
     
     def onboard_led_active(self, new_state):
@@ -129,24 +212,27 @@ class Proc:
     # Change NTP-Settings (Wintertime and GMT-Osffset)
     def change_GMT_time(
             self, 
-            winter=True, 
-            GMT_adjust=3600
+            winter=None, 
+            GMT_adjust=None
             ):
         
-        from json_config_parser import config
-        time_setting    = config('/params/time_setting.json', layers=1)
-        use_winter_time = time_setting.get(param='use_winter_time')
-        GMT_offset      = time_setting.get(param='GMT_offset')
+        from NTP import load_settings
+        time_setting    = load_settings()
+        changes         = []
         
-        if winter != use_winter_time:
-            time_setting.save_param(param='use_winter_time', new_value=winter)
-            Log('NTP', f'[ INFO  ]: Changed Wintertime to {winter}')
-            return self.make_result(msg=f'set wintertime to {winter}. Changes will take effect after reboot', is_error=False, origin='admin/NTP')
+        # Both settings in one write
+        with time_setting.batch():
+            if winter is not None and winter != time_setting.get(param='use_winter_time'):
+                time_setting.save_param(param='use_winter_time', new_value=winter)
+                ntp_event.log('I', 'Changed Wintertime to %s', winter)
+                changes.append(f'set wintertime to {winter}. Changes will take effect with the next NTP-sync')
+            
+            if GMT_adjust is not None and GMT_adjust != time_setting.get(param='GMT_offset'):
+                time_setting.save_param(param='GMT_offset', new_value=GMT_adjust)
+                ntp_event.log('I', 'Adjusted GMT-Offset to %s', GMT_adjust)
+                changes.append(f'set GMT-Offset to {GMT_adjust}. Changes will take effect after reboot')
         
-        if GMT_adjust != GMT_offset:
-            time_setting.save_param('GMT_offset', GMT_adjust)
-            Log('NTP', f'[ INFO  ]: Adjusted GMT-Offset to {GMT_adjust}')
-            return self.make_result(msg=f'set GMT-Offset to {GMT_adjust}. Changes will take effect after reboot', is_error=False, origin='admin/NTP')
+        return self.make_result(msg=' | '.join(changes) or 'No change', is_error=False, origin='admin/NTP')
 
     def get_version(self):
         import versions
@@ -157,18 +243,38 @@ class Proc:
 
     # Change LED-quantity
     def change_led_qty(self, new_value):
-        LightControl.change_pixel_qty(new_value)
+        light.LC.change_pixel_qty(new_value)
         return self.make_result(msg=f'NeoPixel Quantity changed to {new_value}', origin='LightControl')
     
     # Change Autostart-setting
     def change_autostart_setting(self, new_value):
-        LightControl.change_autostart(new_value)
+        light.LC.change_autostart(new_value)
         return self.make_result(msg=f'NeoPixel Autostart changed to {new_value}', origin='LightControl')
 
+    # Change the log-level of a subsystem at runtime. subsystem='all' changes all subsystems
+    def set_log_level(self, level):
+        sub = self.data.get('subsystem', 'all')
+        try:
+            logger.set_level(sub, level)
+        except ValueError as e:
+            return self.make_result(msg=str(e), is_error=True, origin='admin')
+        return self.make_result(msg=f'Log-level of {sub} set to {logger.get_level(sub)}', is_error=False, origin='admin')
+
+    # Stream the log of a subsystem to <client>/log/<subsystem>. Optional: chunk, offset, tail, since
     def get_log(self):
+        from PicoClient import mqtt, mqttClient
         sub = self.data['subsystem']
-        logs = get_log(sub)
-        return self.make_result(msg=logs, is_error=False, origin='admin')
+        tail = self.data.get('tail')
+        reader = logger.open_log(
+            sub,
+            chunk=min(max(int(self.data.get('chunk', 512)), 64), 1024),
+            offset=int(self.data.get('offset', 0)),
+            tail=None if tail is None else int(tail),
+            since=self.data.get('since')
+        )
+        topic = f'{mqttClient}/log/{sub}'
+        mqtt.stream(topic, reader)
+        return self.make_result(msg={"topic": topic, "files": len(reader.files), "bytes": reader.total - reader.pos}, is_error=False, origin='admin')
     
     def set_mqtt(self):
         broker = self.data['broker']
@@ -179,6 +285,17 @@ class Proc:
         #TODO: Eingegebene Daten im Config-File speichern!
         return self.make_result(msg=f'Changed MQTT-Settings. New Broker: {broker}. The client will no longer be reachable via this broker after a reboot!')
 
+# Run a binary frame. Only an error is answered, a stream of frames should not be slowed down by the status-messages
+def run_frame(msg):
+    try:
+        if len(msg) < FRAME_HEADER:
+            raise ValueError('Header missing')
+        light.LC.frame_output(msg[1])
+        light.LC.submit('frame', memoryview(msg)[FRAME_HEADER:], (msg[2] << 8) | msg[3], msg[1], bool(msg[0] & FRAME_RLE))
+    except ValueError as e:
+        event.log('W', 'Frame rejected - %s', e)
+        return {"msg": f'Frame rejected: {e}', "is_err_msg": True, "origin": 'LightControl'}
+
 # Run a JSON-String
 def run(json_string):
     try:
@@ -194,12 +311,12 @@ def run(json_string):
         call = getattr(order_instance, order)()
         return call
     except KeyError as e:
-        Log('Order', f'[ ERROR ]: Key-Error / Key not found - {e}')
+        event.log('E', 'Key-Error / Key not found - %s', e)
         return order_instance.make_result(msg=f"Key not found: {e}", is_error=True, origin='order_processing')
     except AttributeError:
-        Log('Order', f'[ ERROR ]: The sub-type >{order}< is not a known instance')
+        event.log('E', 'The sub-type >%s< is not a known instance', order)
         return order_instance.make_result(msg=f"Command not found!", is_error=True, origin='order_processing')
     except Exception as e:
-        Log('Order', f'[ ERROR ]: Unknown Error - {e}')
+        event.log('E', 'Unknown Error - %s', e)
         return order_instance.make_result(msg=f"Unknown Error: {e}", is_error=True, origin='order_processing')
 
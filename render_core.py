@@ -0,0 +1,246 @@
+# Render loop on the second core of the RP2040 (_thread), or in a thread on CPython (threading)
+# Core 0 keeps the network (MQTT, UDP, watchdog), core 1 renders and writes the strips. The cores only share
+# single-producer/single-consumer queues, without locks:
+#   commands:   core 0 -> core 1, method-calls of LightControl (see LightControl.submit). A request() gets its result in a list of the command
+#   events:     core 1 -> core 0, log-messages. The logger is not shared between the cores
+#   states:     core 1 -> core 0, snapshots of the state to save (LightControl.snapshot). The files are only written by core 0
+#   frames:     core 0 -> core 1, complete frames of the UDP-stream in a pool of buffers (FrameSwap)
+# Settings in config.json: "render_core": true in the LightControl_settings
+
+version = '1.1.0'
+
+import sys
+import utime as time
+import logger
+
+event = logger.Create('RenderCore')
+
+# Ring of 'size'-1 items. Only the producer writes 'tail', only the consumer writes 'head'. A slot is published by the write of 'tail'
+class SPSCQueue:
+    def __init__(self, size=32):
+        self.slots  = [None] * size
+        self.size   = size
+        self.head   = 0
+        self.tail   = 0
+
+    # Producer. Returns False, if the queue is full
+    def put(self, item):
+        tail = self.tail
+        after = tail + 1 if tail + 1 < self.size else 0
+        if after == self.head:
+            return False
+        self.slots[tail] = item
+        self.tail = after
+        return True
+
+    # Consumer. Returns None, if the queue is empty
+    def get(self):
+        head = self.head
+        if head == self.tail:
+            return None
+        item = self.slots[head]
+        self.slots[head] = None
+        self.head = head + 1 if head + 1 < self.size else 0
+        return item
+
+    def __len__(self):
+        return (self.tail - self.head) % self.size
+
+# Pool of frame-buffers for one output. A buffer is [bytes, dirty lo, dirty hi].
+# Core 0 fills the back-buffer and publishes it as a whole, core 1 copies the dirty range into the FrameBuffer and gives the buffer back.
+# So core 1 never sees a half written frame, and no buffer is allocated per frame.
+class FrameSwap:
+    def __init__(self, size, count=3):
+        self.size   = size
+        self.free   = SPSCQueue(count + 1)
+        self.full   = SPSCQueue(count + 1)
+        self.back   = None
+        self.dropped = 0
+        for _ in range(count):
+            self.free.put([bytearray(size), size, 0])
+
+    # Core 0: the buffer for the next packets. None, if core 1 still has all buffers
+    def acquire(self):
+        if self.back is None:
+            back = self.free.get()
+            if back is None:
+                self.dropped += 1
+                return None
+            back[1] = self.size
+            back[2] = 0
+            self.back = back
+        return self.back
+
+    # Core 0: the frame is complete
+    def publish(self):
+        if self.back is not None and self.back[2] > self.back[1]:
+            if self.full.put(self.back):
+                self.back = None
+
+class RenderCore:
+    def __init__(
+            self,
+            lc,
+            queue_size=32
+            ):
+
+        """
+        Runs LightControl.tick() on core 1 and the commands of core 0.
+
+        Parameters:
+            lc (LightControl): The light engine. After start(), it may only be changed through lc.submit().
+            queue_size (int): Size of the command- and event-queue.
+
+        Methods:
+        --------
+            start(): starts the render loop on core 1 (or a thread).
+            stop(): ends the render loop after the running frame.
+            call(): queues a method-call of LightControl. Used by LightControl.submit().
+            request(): runs a method of LightControl on core 1 and waits for the result. Used by LightControl.query().
+            frame_swap(): FrameSwap for an output, for the UDP-stream.
+            service(): logs the events of core 1. Call it in the main loop of core 0.
+            get_info(): statistics of the render core.
+        """
+
+        self.lc         = lc
+        self.commands   = SPSCQueue(queue_size)
+        self.events     = SPSCQueue(queue_size)
+        self.states     = SPSCQueue(4)
+        self.swaps      = []
+        self.running    = False
+        self.calls      = 0     # core 0
+        self.overflows  = 0     # core 0
+        self.done       = 0     # core 1
+        self.errors     = 0     # core 1
+
+    def frame_swap(self, output):
+        fb = self.lc.outputs[output]
+        swap = FrameSwap(len(fb.buf))
+        self.swaps.append((fb, swap))
+        return swap
+
+    def start(self):
+        self.running = True
+        self.lc.event = QueueLogger(self.events, self.lc.event)
+        self.lc.core = self
+        if sys.implementation.name == 'micropython':
+            import _thread
+            _thread.start_new_thread(self._run, ())
+        else:
+            # daemon, so a host process ends without stop()
+            import threading
+            threading.Thread(target=self._run, daemon=True).start()
+        event.log('I', 'Render loop started on core 1')
+
+    def stop(self):
+        self.running = False
+
+    # Core 0
+    def call(self, name, args=(), kwargs=None, reply=None):
+        if not self.commands.put((name, args, kwargs or {}, reply)):
+            self.overflows += 1
+            event.log('W', 'Command queue full, %s dropped', name)
+            return False
+        self.calls += 1
+        return True
+
+    # Core 0. Core 1 appends (True, result) or (False, exception) to the reply. Raises OSError, if it does not answer within 'timeout' ms
+    def request(self, name, args=(), kwargs=None, timeout=500):
+        reply = []
+        if not self.call(name, args, kwargs, reply):
+            raise OSError('Command queue full')
+        start = time.ticks_ms()
+        while not reply:
+            if time.ticks_diff(time.ticks_ms(), start) > timeout:
+                raise OSError('No answer of the render core')
+            time.sleep_ms(1)
+        if not reply[0][0]:
+            raise reply[0][1]
+        return reply[0][1]
+
+    # Core 0
+    def service(self):
+        item = self.events.get()
+        while item is not None:
+            item[0].log(item[1], item[2], *item[3])
+            item = self.events.get()
+
+    # Core 1
+    def _run(self):
+        lc = self.lc
+        while self.running:
+            busy = False
+            command = self.commands.get()
+            while command is not None:
+                try:
+                    result = getattr(lc, command[0])(*command[1], **command[2])
+                    self.done += 1
+                    if command[3] is not None:
+                        command[3].append((True, result))
+                except Exception as e:
+                    self.errors += 1
+                    lc.event.log('E', 'Command %s failed - %s', command[0], e)
+                    if command[3] is not None:
+                        command[3].append((False, e))
+                busy = True
+                command = self.commands.get()
+
+            # Frames of the stream: all in order, then one write
+            pushed = False
+            for fb, swap in self.swaps:
+                frame = swap.full.get()
+                while frame is not None:
+                    lo = frame[1] - frame[1] % fb.bpp
+                    fb.blit(memoryview(frame[0])[lo:frame[2]], lo // fb.bpp)
+                    swap.free.put(frame)
+                    pushed = True
+                    frame = swap.full.get()
+            if pushed:
+                lc.write()
+                busy = True
+
+            if lc.tick():
+                busy = True
+
+            # The state to save, for check_save() on core 0. If core 0 has not taken the last ones, it is published with a later pass
+            if lc.needs_save and len(self.states) < self.states.size - 1:
+                self.states.put(lc.snapshot())
+            if not busy:
+                time.sleep_ms(1)
+
+    def get_info(self):
+        return {
+            "version": version,
+            "running": self.running,
+            "calls": self.calls,
+            "done": self.done,
+            "errors": self.errors,
+            "overflows": self.overflows,
+            "queued": len(self.commands),
+            "dropped_frames": sum(swap.dropped for fb, swap in self.swaps)
+        }
+
+# Logger of core 1: the records are queued and written by RenderCore.service() on core 0
+class QueueLogger:
+    def __init__(self, queue, target):
+        self.queue  = queue
+        self.target = target
+
+    def log(self, level, msg, *args):
+        self.queue.put((self.target, level, msg, args))
+
+    def enabled(self, level):
+        return self.target.enabled(level)
+
+# Start the render core, if 'render_core' is set in the LightControl_settings. Returns None otherwise
+def start(lc, stream=None):
+    try:
+        if not lc.settings.get('LightControl_settings', 'render_core'):
+            return None
+    except (KeyError, AttributeError):
+        return None
+    core = RenderCore(lc)
+    if stream:
+        stream.use_core(core)
+    core.start()
+    return core
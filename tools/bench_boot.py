@@ -0,0 +1,73 @@
+# Host-side profile of the module imports at boot.
+# Every module is imported in a fresh interpreter (logger and NTP are already loaded by hostenv). Reports the time and heap (tracemalloc) of the import, incl. its dependencies,
+# the files opened (config-parses, log-directory) and the writes to the strip during the import.
+# Then the import tree of PicoClient from boot_frame.profile_imports(), with the heap of tracemalloc.
+# Usage: python3 tools/bench_boot.py
+# NOTE: CPython compiles the modules on the first import and allocates differently. Compare the modules, not the absolute values.
+
+import os
+import subprocess
+import sys
+
+MODULES = ('LightControl', 'PicoWifi', 'order', 'PicoClient', 'versions')
+TOOLS   = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = '''
+import sys, time, tracemalloc, builtins
+sys.path.insert(0, %r)
+import hostenv
+hostenv.settings(autostart=True)
+import neopixel
+
+opened = []
+_open = builtins.open
+def counting_open(file, *args, **kwargs):
+    opened.append(file)
+    return _open(file, *args, **kwargs)
+
+writes = [0]
+_write = neopixel.NeoPixel.write
+def counting_write(self):
+    writes[0] += 1
+    _write(self)
+neopixel.NeoPixel.write = counting_write
+
+builtins.open = counting_open
+tracemalloc.start()
+start = time.perf_counter()
+__import__(%r)
+elapsed = time.perf_counter() - start
+heap = tracemalloc.get_traced_memory()[0]
+builtins.open = _open
+print('%%.1f %%d %%d %%d' %% (elapsed * 1000, heap, len(opened), writes[0]))
+'''
+
+TREE = '''
+import sys, tracemalloc
+sys.path.insert(0, %r)
+import hostenv
+import boot_frame
+tracemalloc.start()
+boot_frame.heap = lambda: tracemalloc.get_traced_memory()[0]
+boot_frame.profile_imports()
+import PicoClient
+boot_frame.profile_imports(False)
+boot_frame.report()
+'''
+
+def child(code):
+    return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+
+def main():
+    # The first run compiles the modules to __pycache__
+    child(CHILD % (TOOLS, 'versions'))
+    print('import of one module in a fresh interpreter (incl. dependencies)')
+    print('%-14s %10s %10s %8s %8s' % ('module', 'ms', 'heap KB', 'files', 'writes'))
+    for module in MODULES:
+        ms, heap, files, writes = child(CHILD % (TOOLS, module)).split()
+        print('%-14s %10s %10.1f %8s %8s' % (module, ms, int(heap) / 1024, files, writes))
+    print()
+    print(child(TREE % TOOLS), end='')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Host-side check of the config-parses at boot and by admin-orders.
+# Runs the boot stages of main.py (without network), then admin-orders that change config.json and time_setting.json.
+# Reports the parses of a json-file, their time and the heap of the parsed copies (tracemalloc),
+# and whether a change through one module is seen by the others.
+# Usage: python3 tools/bench_config.py
+
+import json
+import time
+import tracemalloc
+
+import hostenv
+
+parses = []
+_load = json.load
+
+def counting_load(f, *args, **kwargs):
+    heap = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    conf = _load(f, *args, **kwargs)
+    parses.append((f.name, time.perf_counter() - start, tracemalloc.get_traced_memory()[0] - heap))
+    return conf
+
+def summary(title, done):
+    count = len(parses) - done
+    ms = sum(p[1] for p in parses[done:]) * 1000
+    heap = sum(p[2] for p in parses[done:])
+    print('%-24s %8d %10.3f %10.1f' % (title, count, ms, heap / 1024))
+    for name, _, _ in parses[done:]:
+        print('    %s' % name[len(hostenv.root):])
+    return len(parses)
+
+def main():
+    json.load = counting_load
+    tracemalloc.start()
+    hostenv.settings(autostart=True)
+    print('%-24s %8s %10s %10s' % ('stage', 'parses', 'ms', 'heap KB'))
+
+    import LightControl
+    LC = LightControl.LC
+    done = summary('light control', 0)
+    import PicoWifi
+    PicoWifi.init()
+    done = summary('wifi', done)
+    import NTP
+    NTP.load_settings()
+    done = summary('ntp', done)
+    import PicoClient
+    PicoClient.init()
+    done = summary('client', done)
+
+    import order
+    order.run(json.dumps({"Type": "admin", "command": "set_GMT_wintertime", "new_value": False}))
+    order.run(json.dumps({"Type": "admin", "command": "publish_in_json", "new_value": True}))
+    summary('admin orders', done)
+
+    print()
+    print('wintertime seen by NTP       %s' % (NTP.time_setting.get(param='use_winter_time') is False))
+    print('publish_in_json seen by LC   %s' % (LC.settings.get('MQTT-config', 'publish_in_json') is True))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Host-side benchmark of the render loop on core 1 (render_core.py), here a thread.
+# A main loop with blocking network-work (like MQTT-messages and socket-timeouts) runs an endless rainbow at 50 fps,
+# once with LC.tick() in the same loop and once with the render core. Reports the frame rate and the gaps between the frames.
+# Usage: python3 tools/bench_core.py
+
+import random
+import time
+
+import hostenv
+from LightControl import LightControl
+from render_core import RenderCore
+
+SECONDS = 3
+NETWORK = [0.001] * 16 + [0.015, 0.03, 0.06]     # blocking time of one loop on core 0 in s
+
+def run(use_core, pixels=150):
+    lc = LightControl(use_config_json=False, logging=False, bpp=4, pixel_pty=pixels, autostart=False, fps=50)
+    stamps = []
+    write = lc.np.write
+
+    def timed_write():
+        stamps.append(time.perf_counter())
+        write()
+    lc.np.write = timed_write
+
+    core = None
+    if use_core:
+        core = RenderCore(lc)
+        core.start()
+    lc.submit('static', [255, 160, 80, 0], 0.8)
+    lc.submit('effect', 'rainbow', 20)
+
+    random.seed(1)
+    end = time.perf_counter() + SECONDS
+    level = 0
+    while time.perf_counter() < end:
+        time.sleep(random.choice(NETWORK))
+        if random.random() < 0.05:
+            level = 100 - level
+            lc.submit('set_dim', level, 5)
+        if core:
+            core.service()
+        else:
+            lc.tick()
+    if core:
+        core.stop()
+        time.sleep(0.05)
+
+    gaps = sorted((b - a) * 1000 for a, b in zip(stamps, stamps[1:]))
+    return len(stamps) / SECONDS, gaps[len(gaps) // 2], gaps[int(len(gaps) * 0.95)], gaps[-1], core
+
+def main():
+    print('rainbow at 50 fps with blocking network-work on core 0, %d s' % SECONDS)
+    print('%-12s %8s %10s %10s %10s' % ('render', 'fps', 'gap p50', 'gap p95', 'gap max'))
+    for use_core in (False, True):
+        fps, p50, p95, worst, core = run(use_core)
+        print('%-12s %8.1f %8.1fms %8.1fms %8.1fms' % ('core 1' if use_core else 'main loop', fps, p50, p95, worst))
+        if core:
+            print('render core  %s' % core.get_info())
+
+if __name__ == '__main__':
+    main()
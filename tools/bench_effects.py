@@ -0,0 +1,42 @@
+# Host-side benchmark of the effect library (LightControl.effect).
+# Reports the render time per frame of every effect for different strip lengths, without the write to the strip.
+# Usage: python3 tools/bench_effects.py
+# NOTE: CPython on a PC is much faster than MicroPython on a Pico. Compare the effects and lengths, not the absolute values.
+
+import time
+
+import hostenv
+from LightControl import LightControl, EFFECTS
+
+PIXELS  = (12, 150, 600)
+FRAMES  = 500
+PERIOD  = 20        # ms per frame (50 fps)
+PALETTE = [[255, 0, 0, 0], [0, 0, 255, 0], [0, 255, 0, 0]]
+
+# Best of 'rounds': render FRAMES frames of the effect, as tick() does. Returns us per frame
+def frame_time(lc, name, speed, rounds=5):
+    best = None
+    for _ in range(rounds):
+        lc.effect(name, speed, PALETTE)
+        anim = lc.segments[0].animations['color'][0]
+        start = time.perf_counter()
+        for frame in range(FRAMES):
+            anim.step(frame * PERIOD)
+            lc.fb.show()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / FRAMES * 1000000
+
+def main():
+    print('effect frame time in us (render only, %d frames), bpp=4' % FRAMES)
+    print('%-10s' % 'effect' + ''.join('%10s' % ('%d px' % p) for p in PIXELS))
+    for name in EFFECTS:
+        row = []
+        for pixels in PIXELS:
+            lc = LightControl(use_config_json=False, logging=False, bpp=4, pixel_pty=pixels, autostart=False)
+            lc.static([255, 160, 80, 0], 0.8)
+            row.append(frame_time(lc, name, speed=10))
+        print('%-10s' % name + ''.join('%10.1f' % us for us in row))
+
+if __name__ == '__main__':
+    main()
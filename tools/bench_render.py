@@ -0,0 +1,189 @@
+# Host-side benchmark of the LightControl render path.
+# Reports frames per second of a dim ramp (0...100 %), of a smooth color transition and of a line-animation for different strip lengths,
+# the frame time for several outputs (strips on their own pins) and the temporal dithering at low levels.
+# Usage: python3 tools/bench_render.py
+# NOTE: CPython on a PC is much faster than MicroPython on a Pico. Compare the ratio, not the absolute values.
+
+import time
+
+import hostenv
+from LightControl import LightControl, EASING, DITHER_BITS
+
+PIXELS  = (12, 150, 600)
+OUTPUTS = (1, 2, 4, 8)
+WIRE_US = 8 * 1.25     # WS2812 with 800 kHz: 1.25 us per bit
+LEVELS  = [i / 100 for i in range(101)]
+
+# static() before the gamma-table (Baldr 7.2.1), as reference
+def legacy_static(lc, color, level_255):
+    while len(color) < 4:
+        color.append(0)
+    dimmed_color = tuple((c * level_255) // 255 for c in color[:4])
+    for i in range(lc.pixel):
+        lc.np[i] = dimmed_color
+    lc.np.write()
+    lc.cache = color
+    return color
+
+# Best of 'rounds' to reduce the noise of the host
+def fps(frame, frames, min_time=0.2, rounds=5):
+    best = 0
+    for _ in range(rounds):
+        runs = 0
+        start = time.perf_counter()
+        while True:
+            for level in frames:
+                frame(level)
+            runs += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, runs * len(frames) / elapsed)
+    return best
+
+# line() before the FrameBuffer: one NeoPixel.__setitem__ per pixel
+def legacy_line(lc, color):
+    for i in range(lc.pixel):
+        lc.np[i] = color
+
+# set_smooth() before the fixed-point transition (Baldr 7.12): new list per frame, then static() dims it again
+def legacy_smooth(lc, current, target, elapsed, duration):
+    intermediate = [current[i] + (target[i] - current[i]) * elapsed // duration for i in range(4)]
+    lc.static(intermediate, 0.5)
+
+# One frame of the transition generator. A new transition starts with elapsed 0
+def smooth(lc, state, current, target, elapsed, duration):
+    if elapsed == 0:
+        seg = lc.segments[0]
+        seg.color = list(current)
+        state[0] = lc._smooth_frames(seg, target, duration, EASING['linear'])
+        next(state[0])
+    state[0].send(elapsed)
+    lc.show()
+
+def line(lc, pattern):
+    for i in range(lc.pixel):
+        lc.fb.put(i, pattern)
+    lc.fb.show()
+
+# As rendered by line(): the pixels of a frame in one put_pixels()
+def line_pixels(lc, leds, pattern):
+    lc.fb.put_pixels(leds, 0, len(leds), pattern)
+    lc.fb.show()
+
+def main():
+    color = [255, 160, 80, 0]
+    for bpp in (3, 4):
+        print('dim ramp, bpp=%d' % bpp)
+        print('%-8s %12s %12s %8s' % ('pixels', 'before fps', 'after fps', 'ratio'))
+        for pixels in PIXELS:
+            lc = LightControl(use_config_json=False, logging=False, bpp=bpp, pixel_pty=pixels, autostart=False)
+            before = fps(lambda level: legacy_static(lc, color, int(level * 255)), LEVELS)
+            legacy_buf = bytes(lc.np.buf)
+            after = fps(lambda level: lc.static(color, level), LEVELS)
+            lc.static(color, 1)
+            assert bytes(lc.np.buf) == legacy_buf, 'FrameBuffer differs from NeoPixel'
+            print('%-8d %12.0f %12.0f %7.2fx' % (pixels, before, after, after / before))
+
+    print('smooth transition (50 frames), bpp=4')
+    print('%-8s %12s %12s %8s' % ('pixels', 'before fps', 'after fps', 'ratio'))
+    current, target, duration = [255, 160, 80, 0], [0, 40, 255, 30], 50
+    for pixels in PIXELS:
+        lc = LightControl(use_config_json=False, logging=False, bpp=4, pixel_pty=pixels, autostart=False)
+        lc.level = 0.5
+        before = fps(lambda elapsed: legacy_smooth(lc, current, target, elapsed, duration), range(duration))
+        state = [None]
+        after = fps(lambda elapsed: smooth(lc, state, current, target, elapsed, duration), range(duration))
+        print('%-8d %12.0f %12.0f %7.2fx' % (pixels, before, after, after / before))
+
+    print('line, per pixel (full strip = 1 frame), bpp=4')
+    print('%-8s %12s %12s %8s' % ('pixels', 'before fps', 'after fps', 'ratio'))
+    for pixels in PIXELS:
+        lc = LightControl(use_config_json=False, logging=False, bpp=4, pixel_pty=pixels, autostart=False)
+        colors = (color, [0, 0, 255, 0])
+        patterns = [lc.fb.pattern(c) for c in colors]
+        before = fps(lambda i: legacy_line(lc, colors[i]), (0, 1))
+        after = fps(lambda i: line(lc, patterns[i]), (0, 1))
+        print('%-8d %12.0f %12.0f %7.2fx' % (pixels, before, after, after / before))
+
+    print('line, put_pixels (full strip = 1 frame), bpp=4')
+    print('%-8s %12s %12s %8s' % ('pixels', 'before fps', 'after fps', 'ratio'))
+    for pixels in PIXELS:
+        lc = LightControl(use_config_json=False, logging=False, bpp=4, pixel_pty=pixels, autostart=False)
+        colors = (color, [0, 0, 255, 0])
+        patterns = [lc.fb.pattern(c) for c in colors]
+        leds = list(range(pixels))
+        before = fps(lambda i: legacy_line(lc, colors[i]), (0, 1))
+        after = fps(lambda i: line_pixels(lc, leds, patterns[i]), (0, 1))
+        print('%-8d %12.0f %12.0f %7.2fx' % (pixels, before, after, after / before))
+
+    print('repeated static color (no change on the strip), bpp=4')
+    print('%-8s %12s %12s' % ('pixels', 'writes', 'skipped'))
+    for pixels in PIXELS:
+        lc = LightControl(use_config_json=False, logging=False, bpp=4, pixel_pty=pixels, autostart=False)
+        for _ in range(100):
+            lc.static(color, 0.5)
+        info = lc.fb.get_info()
+        print('%-8d %12d %12d' % (pixels, info['writes'], info['skipped_writes']))
+
+    bench_outputs()
+    bench_dither()
+
+# One frame of a dim ramp on the given outputs, as rendered by tick()
+def output_frame(lc, segments, level, counter):
+    for seg in segments:
+        seg.render(level=level)
+    lc.show()
+    counter[0] += 1
+
+def bench_outputs(pixels=150):
+    print('frame time per output count, %d pixels per output, bpp=4' % pixels)
+    print('%-8s %-8s %10s %10s %10s %8s' % ('outputs', 'changed', 'cpu ms', 'wire ms', 'total ms', 'writes'))
+    for count in OUTPUTS:
+        outputs = [{"id": "out%d" % i, "led_pin": i, "led_qty": pixels, "bytes_per_pixel": 4} for i in range(count)]
+        for changed in sorted({1, count}):
+            lc = LightControl(use_config_json=False, logging=False, bpp=4, pixel_pty=pixels, autostart=False, outputs=outputs)
+            lc.static([255, 160, 80, 0], 0)
+            segments = lc.segments[:changed]
+            for fb in lc.outputs:
+                fb.np.written = fb.np.writes = 0
+            counter = [0]
+            cpu = 1000 / fps(lambda level: output_frame(lc, segments, level, counter), LEVELS)
+            # The strips are written one after another, unchanged outputs are skipped
+            writes = sum(fb.np.writes for fb in lc.outputs) / counter[0]
+            wire = sum(fb.np.written for fb in lc.outputs) / counter[0] * WIRE_US / 1000
+            print('%-8d %-8d %10.3f %10.3f %10.3f %8.1f' % (count, changed, cpu, wire, cpu + wire, writes))
+
+# Brightness of the channels, averaged over one dither-cycle, for every level below 10 %
+def low_levels(lc, color):
+    seg = lc.segments[0]
+    levels = set()
+    for level in range(1, 26):
+        lc.static(color, level / 255)
+        if not seg.dithering:
+            levels.add(tuple(seg.pattern))
+            continue
+        total = [0] * lc.bpp
+        for phase in range(1 << DITHER_BITS):
+            seg.dither_frame(phase)
+            for i in range(lc.bpp):
+                total[i] += lc.np.buf[i]
+        levels.add(tuple(total))
+    return len(levels)
+
+def bench_dither():
+    color = [255, 160, 80, 0]
+    print('dithering: distinct levels from 1 to 10 %%, color %s' % color)
+    for dither in (False, True):
+        lc = LightControl(use_config_json=False, logging=False, bpp=4, pixel_pty=12, autostart=False, dither=dither)
+        print('%-8s %12d' % ('dither' if dither else '8 bit', low_levels(lc, color)))
+    print('dither frame, bpp=4')
+    print('%-8s %12s' % ('pixels', 'fps'))
+    for pixels in PIXELS:
+        lc = LightControl(use_config_json=False, logging=False, bpp=4, pixel_pty=pixels, autostart=False, dither=True)
+        lc.static(color, 0.03)
+        seg = lc.segments[0]
+        print('%-8d %12.0f' % (pixels, fps(lambda phase: (seg.dither_frame(phase), lc.fb.show()), range(1 << DITHER_BITS))))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Host-side benchmark of json_config_parser writes.
+# An update of several keys, once with one save_param() per key and once in a batch(). Reports the updates and file-writes
+# per second and the bytes written per update. Then a reset before the rename of the temp-file is simulated: the file has to keep its last state.
+# Usage: python3 tools/bench_save.py
+# NOTE: the host writes to a RAM-cached file system. On the flash of a Pico a write takes ms, so the writes per update count, not the time.
+
+import json
+import os
+import time
+
+import hostenv
+import json_config_parser
+from json_config_parser import config, journal
+
+UPDATES = 200
+
+def mqtt_update(cfg, i):
+    cfg.save_param('MQTT-config', 'Broker', '10.0.0.%d' % (i % 250))
+    cfg.save_param('MQTT-config', 'Client', 'baldr-%d' % i)
+    cfg.save_param('MQTT-config', 'User', 'user')
+    cfg.save_param('MQTT-config', 'PW', 'secret')
+
+def status_update(status, i):
+    status.save_param(param='color', new_value=[i % 256, 160, 80, 0])
+    status.save_param(param='dim_status', new_value=i % 100)
+    status.save_param(param='led_qty', new_value=12)
+
+def run(cfg, update, batch):
+    stats = json_config_parser.stats
+    writes, written = stats["writes"], stats["bytes"]
+    start = time.perf_counter()
+    for i in range(UPDATES):
+        if batch:
+            with cfg.batch():
+                update(cfg, i)
+        else:
+            update(cfg, i)
+    elapsed = time.perf_counter() - start
+    writes = stats["writes"] - writes
+    return UPDATES / elapsed, writes / elapsed, writes / UPDATES, (stats["bytes"] - written) / UPDATES
+
+# Reset after the temp-file is written, before the rename: the file keeps the last complete state.
+# The real _replace() runs, only os.rename is interrupted
+def torn_write(cfg):
+    before = hostenv.path('/params/config.json')
+    with open(before) as f:
+        saved = json.load(f)
+
+    class Reset(Exception):
+        pass
+
+    def failing(src, dst):
+        raise Reset()
+
+    rename = os.rename
+    os.rename = failing
+    try:
+        cfg.save_param('MQTT-config', 'Broker', 'torn')
+    except Reset:
+        pass
+    finally:
+        os.rename = rename
+    with open(before + '.tmp') as f:
+        written = json.load(f)["MQTT-config"][0]["Broker"] == 'torn'
+    with open(before) as f:
+        return written and json.load(f) == saved
+
+def main():
+    cfg = config('/params/config.json')
+    status = journal('/params/status.json', compact=1 << 30)
+    print('%d updates' % UPDATES)
+    print('%-34s %10s %10s %12s %12s' % ('update', 'updates/s', 'writes/s', 'writes/upd', 'bytes/upd'))
+    for name, target, update in (('config.json, 4 keys', cfg, mqtt_update), ('status.json journal, 3 keys', status, status_update)):
+        for batch in (False, True):
+            rate, write_rate, writes, size = run(target, update, batch)
+            print('%-34s %10.0f %10.0f %12.1f %12.1f' % (name + (' batch' if batch else ''), rate, write_rate, writes, size))
+    print()
+    print('file unchanged after a reset before the rename: %s' % torn_write(cfg))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# DDP-sender for the UDP-stream (udp_stream.py). Sends a running rainbow in wire order (GRB/GRBW).
+# Usage:
+#   python3 tools/ddp_send.py --host 192.168.1.50 --pixels 150          # stream to a device
+#   python3 tools/ddp_send.py --local                                   # receiver in this process, with the stub NeoPixel
+#   python3 tools/ddp_send.py --local --core                            # same, the frames are rendered by the render core (thread)
+# With --local, every frame is checked against the NeoPixel-buffer, a late packet is sent and the fallback after the timeout is checked.
+
+import argparse
+import colorsys
+import socket
+import time
+
+HEADER      = 10
+MAX_DATA    = 1440
+
+def frame(pixels, bpp, step):
+    data = bytearray(pixels * bpp)
+    for i in range(pixels):
+        r, g, b = colorsys.hsv_to_rgb(((i + step) % pixels) / pixels, 1, 1)
+        data[i * bpp:i * bpp + 3] = bytes((int(g * 255), int(r * 255), int(b * 255)))
+    return data
+
+# Split a frame into packets of max. MAX_DATA bytes, the last one with the push-flag
+def packets(data, seq, output=1, bpp=3):
+    size = MAX_DATA - MAX_DATA % bpp
+    for offset in range(0, len(data), size):
+        chunk = data[offset:offset + size]
+        flags = 0x40 | (0x01 if offset + size >= len(data) else 0)
+        header = bytes((flags, seq, 0, output)) + offset.to_bytes(4, 'big') + len(chunk).to_bytes(2, 'big')
+        yield header + chunk
+
+def send(sock, addr, data, seq, bpp):
+    for packet in packets(data, seq, bpp=bpp):
+        sock.sendto(packet, addr)
+
+def local(args):
+    import hostenv
+    hostenv.settings(led_qty=args.pixels, bytes_per_pixel=args.bpp)
+    from LightControl import LC
+    import udp_stream
+
+    LC.static([255, 160, 80, 0], 0.5)
+    before = bytes(LC.np.buf)
+    stream = udp_stream.UDPStream(LC, args.port, timeout=200)
+    core = None
+    if args.core:
+        from render_core import RenderCore
+        core = RenderCore(LC)
+        stream.use_core(core)
+        core.start()
+
+    # With the render core, the frame is written on the other thread
+    def settle():
+        if core:
+            time.sleep(0.005)
+            core.service()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    addr = ('127.0.0.1', args.port)
+
+    start = time.perf_counter()
+    for i in range(args.frames):
+        data = frame(args.pixels, args.bpp, i)
+        send(sock, addr, data, i % 15 + 1, args.bpp)
+        time.sleep(0.001)
+        stream.poll()
+        settle()
+        assert bytes(LC.np.buf) == data, 'frame %d differs' % i
+    elapsed = time.perf_counter() - start
+
+    # A late packet (older sequence-number) is dropped
+    last = bytes(LC.np.buf)
+    send(sock, addr, frame(args.pixels, args.bpp, 99), (args.frames - 2) % 15 + 1, args.bpp)
+    time.sleep(0.001)
+    stream.poll()
+    settle()
+    assert bytes(LC.np.buf) == last, 'late frame was rendered'
+
+    # Fallback to the LightControl-state after the timeout
+    time.sleep(0.3)
+    stream.poll()
+    settle()
+    assert bytes(LC.np.buf) == before, 'no fallback after timeout'
+
+    print('frames sent     %d in %.2f s' % (args.frames, elapsed))
+    print('stream          %s' % stream.get_info())
+    print('strip writes    %d' % LC.np.writes)
+    if core:
+        print('render core     %s' % core.get_info())
+    print('ok')
+
+def main():
+    parser = argparse.ArgumentParser(description='DDP-sender for udp_stream.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4048)
+    parser.add_argument('--pixels', type=int, default=150)
+    parser.add_argument('--bpp', type=int, default=3)
+    parser.add_argument('--fps', type=float, default=40)
+    parser.add_argument('--frames', type=int, default=400)
+    parser.add_argument('--local', action='store_true', help='receive in this process with the stub NeoPixel')
+    parser.add_argument('--core', action='store_true', help='with --local: render on the render core (thread)')
+    args = parser.parse_args()
+
+    if args.local:
+        local(args)
+        return
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for i in range(args.frames):
+        send(sock, (args.host, args.port), frame(args.pixels, args.bpp, i), i % 15 + 1, args.bpp)
+        time.sleep(1 / args.fps)
+
+if __name__ == '__main__':
+    main()
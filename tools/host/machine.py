@@ -0,0 +1,38 @@
+# Host stub of the MicroPython machine-module. Only what the Baldr modules use.
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 4
+
+    def __init__(self, id=None, mode=None, pull=None, value=None):
+        self.id = id
+        self._value = value or 0
+
+    def init(self, mode=None, pull=None, value=None):
+        pass
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = value
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+class RTC:
+    _offset = 0
+
+    def datetime(self, dt=None):
+        import time
+        if dt is None:
+            tm = time.localtime(time.time() + RTC._offset)
+            return (tm[0], tm[1], tm[2], tm[6], tm[3], tm[4], tm[5], 0)
+        RTC._offset = time.mktime((dt[0], dt[1], dt[2], dt[4], dt[5], dt[6], 0, 0, -1)) - time.time()
+
+def reset():
+    raise SystemExit('machine.reset()')
@@ -0,0 +1,31 @@
+# Host stub of the MicroPython network-module. The WLAN is always connected, the host has its own network.
+
+STA_IF = 0
+AP_IF = 1
+
+def hostname(name=None):
+    return 'baldr-host'
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self._active = False
+
+    def active(self, state=None):
+        if state is None:
+            return self._active
+        self._active = state
+
+    def connect(self, ssid=None, key=None):
+        self._active = True
+
+    def isconnected(self):
+        return self._active
+
+    def status(self):
+        return 3 if self._active else 0
+
+    def config(self, **kwargs):
+        pass
+
+    def ifconfig(self):
+        return ('127.0.0.1', '255.0.0.0', '127.0.0.1', '127.0.0.1')
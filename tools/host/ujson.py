@@ -0,0 +1 @@
+from json import *
@@ -0,0 +1 @@
+from socket import *
@@ -0,0 +1,22 @@
+# Host stub of the MicroPython utime-module
+
+from time import time, sleep, localtime, gmtime, mktime
+import time as _time
+
+def ticks_ms():
+    return int(_time.monotonic() * 1000)
+
+def ticks_us():
+    return int(_time.monotonic() * 1000000)
+
+def ticks_add(ticks, delta):
+    return ticks + delta
+
+def ticks_diff(a, b):
+    return a - b
+
+def sleep_ms(ms):
+    _time.sleep(ms / 1000)
+
+def sleep_us(us):
+    _time.sleep(us / 1000000)
@@ -0,0 +1,72 @@
+# Run Baldr modules with CPython on a Linux host (benchmarks, local tests).
+# Import this module first. It adds the stubs from tools/host to the path and maps the absolute
+# device paths (/params, /log) to a temporary directory with a default configuration.
+
+import json
+import os
+import sys
+import tempfile
+
+TOOLS   = os.path.dirname(os.path.abspath(__file__))
+REPO    = os.path.dirname(TOOLS)
+
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.join(TOOLS, 'host'))
+
+root = tempfile.mkdtemp(prefix='baldr_')
+
+CONFIG = {
+    "Version": "5.5",
+    "LightControl_settings": [{"led_pin": 15, "bytes_per_pixel": 4, "autostart": False, "led_qty": 12}],
+    "Wifi-config": [{"SSID": "host", "PW": "", "Hostname": "baldr-host", "country": "DE", "IP": "",
+                     "led_active": False, "onboard_led": 2, "led_inverted": False}],
+    "MQTT-config": [{"Client": "baldr-host", "Broker": "127.0.0.1", "Port": 1883, "User": "", "PW": "",
+                     "publish_in_json": False}]
+}
+STATUS          = {"color": [255, 160, 80, 0], "dim_status": 50}
+TIME_SETTING    = {"use_winter_time": True, "offline_time": 0, "GMT_offset": 3600}
+
+def path(device_path):
+    if device_path.startswith('/'):
+        return os.path.join(root, device_path.lstrip('/'))
+    return device_path
+
+def write_json(device_path, content):
+    with open(path(device_path), 'w') as f:
+        json.dump(content, f)
+
+def settings(**lc_settings):
+    """Change LightControl_settings in the host config.json (before LightControl is imported)."""
+    CONFIG['LightControl_settings'][0].update(lc_settings)
+    write_json('/params/config.json', CONFIG)
+    import json_config_parser
+    json_config_parser.forget(path('/params/config.json'))
+
+os.makedirs(path('/params'))
+os.makedirs(path('/log'))
+write_json('/params/config.json', CONFIG)
+write_json('/params/status.json', STATUS)
+write_json('/params/time_setting.json', TIME_SETTING)
+
+# Map the device paths of the config-parser and the logger to the temp directory
+import json_config_parser
+
+_config_init = json_config_parser.config.__init__
+
+def _host_config_init(self, file='config.json', layers=2):
+    _config_init(self, path(file), layers)
+
+json_config_parser.config.__init__ = _host_config_init
+
+import boot_frame
+
+boot_frame.FILE = path(boot_frame.FILE)
+
+import logger
+
+_get_sink = logger.get_sink
+
+def _host_get_sink(dir='/log/', max_size=4096):
+    return _get_sink(path(dir), max_size)
+
+logger.get_sink = _host_get_sink
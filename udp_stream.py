@@ -0,0 +1,193 @@
+# Real-time pixel-stream over UDP (DDP - Distributed Display Protocol)
+# The frames are copied into the FrameBuffer of LightControl, no JSON and no MQTT on the way.
+# Settings in config.json: "Stream-config": [{"enabled": true, "port": 4048, "timeout": 2000}]
+
+version = '1.1.0'
+
+import usocket as socket
+import utime as time
+import logger
+
+event = logger.Create('Stream')
+
+# DDP-Header: [flags][sequence][data-type][destination][offset (4 bytes)][length (2 bytes)]
+HEADER      = 10
+MAX_DATA    = 1440      # DDP-maximum, 480 RGB-pixels per packet
+PORT        = 4048
+FLAG_PUSH   = 0x01      # last packet of a frame, write the strip
+FLAG_QUERY  = 0x02
+
+class UDPStream:
+    def __init__(
+            self,
+            lc,
+            port=PORT,
+            timeout=2000
+            ):
+
+        """
+        Receives DDP-packets in one preallocated buffer and copies the pixel-data into the FrameBuffers of LightControl.
+        The pixel-data has to be in wire order of the strip (GRB or GRBW), the offset in bytes.
+
+        Parameters:
+            lc (LightControl): The light engine with the outputs.
+            port (int): UDP-Port. 4048 is the DDP-default.
+            timeout (int): Stream-timeout in ms. After the timeout, the strips are set back to the state of LightControl.
+
+        Methods:
+        --------
+            poll(): receives all waiting packets and writes the strips once. Call it in the main loop.
+            stop(): ends the stream and redraws the LightControl-state.
+            use_core(): hands the frames to the render core instead of writing them here.
+            get_info(): statistics of the stream.
+
+        The destination-id of a packet is the output (1=first output). Packets with a sequence-number older than the last one are dropped.
+        """
+
+        self.lc         = lc
+        self.timeout    = timeout
+        self.buf        = bytearray(HEADER + MAX_DATA)
+        self.mv         = memoryview(self.buf)
+
+        # memoryviews per packet-layout, so a frame with the same layout allocates nothing
+        self._src       = {}    # length -> view on the received data
+        self._dst       = {}    # (offset << 8 | output) -> view on the FrameBuffer
+
+        # FrameSwap per output, if the render loop runs on core 1 (see use_core)
+        self._swaps     = None
+
+        self.streaming  = False
+        self.last       = 0
+        self.seq        = 0
+        self.frames     = 0
+        self.packets    = 0
+        self.dropped    = 0
+        self.timeouts   = 0
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(socket.getaddrinfo('0.0.0.0', port)[0][-1])
+        self.sock.setblocking(False)
+        event.log('I', 'Listening for DDP on port %d', port)
+
+    # Receive all waiting packets. The strips are written once, after the last pushed frame
+    def poll(self):
+        push = False
+        while True:
+            try:
+                size = self.sock.recv_into(self.buf)
+            except OSError:
+                break
+            if self._packet(size):
+                push = True
+
+        now = time.ticks_ms()
+        if push:
+            if not self.streaming:
+                self._start()
+            self.last = now
+            self.frames += 1
+            if self._swaps:
+                for swap in self._swaps:
+                    swap.publish()
+            else:
+                self.lc.write()
+        elif self.streaming and time.ticks_diff(now, self.last) > self.timeout:
+            self.timeouts += 1
+            event.log('I', 'Stream timeout after %d frames', self.frames)
+            self.stop()
+        return push
+
+    # Copy one packet into the FrameBuffer. Returns True, if the frame is complete (push-flag)
+    def _packet(self, size):
+        buf = self.buf
+        flags = buf[0]
+        if size < HEADER or flags & 0xC0 != 0x40 or flags & FLAG_QUERY:
+            self.dropped += 1
+            return False
+        self.packets += 1
+
+        # Late packet: sequence 1...15 is older than the last one
+        seq = buf[1] & 0x0F
+        if seq and self.seq and 0 < (self.seq - seq) & 0x0F < 8:
+            self.dropped += 1
+            return False
+        if seq:
+            self.seq = seq
+
+        output = buf[3] - 1 if buf[3] else 0
+        offset = (buf[4] << 24) | (buf[5] << 16) | (buf[6] << 8) | buf[7]
+        length = min((buf[8] << 8) | buf[9], size - HEADER)
+        if not 0 <= output < len(self.lc.outputs):
+            self.dropped += 1
+            return False
+        fb = self.lc.outputs[output]
+        length = min(length, len(fb.buf) - offset, MAX_DATA)
+        if length > 0 and self._swaps:
+            frame = self._swaps[output].acquire()
+            if frame is None:
+                self.dropped += 1
+                return False
+            src = self._src.get(length)
+            if src is None:
+                src = self._src[length] = self.mv[HEADER:HEADER + length]
+            frame[0][offset:offset + length] = src
+            frame[1] = min(frame[1], offset)
+            frame[2] = max(frame[2], offset + length)
+        elif length > 0:
+            key = (offset << 8) | output
+            dst = self._dst.get(key)
+            if dst is None or len(dst) != length:
+                if len(self._dst) >= 32:
+                    self._dst.clear()
+                dst = self._dst[key] = fb.mv[offset:offset + length]
+            src = self._src.get(length)
+            if src is None:
+                src = self._src[length] = self.mv[HEADER:HEADER + length]
+            fb.sum += sum(src) - sum(dst)
+            dst[:] = src
+            if fb.fills:
+                fb._forget(offset // fb.bpp, (offset + length + fb.bpp - 1) // fb.bpp)
+            fb.mark(offset, offset + length)
+        return bool(flags & FLAG_PUSH)
+
+    # The stream takes over: running animations would paint over the frames
+    def _start(self):
+        self.streaming = True
+        self.lc.submit('hold')
+        event.log('I', 'Stream started')
+
+    def stop(self):
+        self.streaming = False
+        self.seq = 0
+        self.lc.submit('redraw')
+
+    # The frames are copied by the render core. Call it before the first poll()
+    def use_core(self, core):
+        self._swaps = [core.frame_swap(i) for i in range(len(self.lc.outputs))]
+
+    def get_info(self):
+        return {
+            "version": version,
+            "streaming": self.streaming,
+            "frames": self.frames,
+            "packets": self.packets,
+            "dropped": self.dropped,
+            "timeouts": self.timeouts
+        }
+
+# Create the stream from the Stream-config, if it is enabled. Returns None otherwise
+def start(lc, settings):
+    try:
+        if not settings.get('Stream-config', 'enabled'):
+            return None
+    except KeyError:
+        return None
+    try:
+        port = settings.get('Stream-config', 'port')
+    except KeyError:
+        port = PORT
+    try:
+        timeout = settings.get('Stream-config', 'timeout')
+    except KeyError:
+        timeout = 2000
+    return UDPStream(lc, port, timeout)
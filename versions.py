@@ -7,8 +7,11 @@ from NTP import Version as NTP
 from LightControl import version as LC
 from json_config_parser import version as json
 from mqtt_handler import version as mqtt_handler
+from udp_stream import version as stream
+from render_core import version as render_core
+from boot_frame import version as boot_frame
 
-versions = {'Client': Client, 'Wifi': Wifi, 'Order': Order, 'NTP': NTP, 'LightControl': LC, 'json': json, 'MQTT-Handler': mqtt_handler}
+versions = {'Client': Client, 'Wifi': Wifi, 'Order': Order, 'NTP': NTP, 'LightControl': LC, 'json': json, 'MQTT-Handler': mqtt_handler, 'Stream': stream, 'RenderCore': render_core, 'BootFrame': boot_frame}
 
 def by_module(module):
     return versions[module]